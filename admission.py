@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# Admission control: token-bucket rate limits per client and route class, and
+# load shedding driven by observed delay. Cheap classes are shed last.
+
+AUTH_PATHS = ('/api/login', '/api/register', '/api/auth/google')
+BULK_PATHS = ('/api/upload', '/api/upload/bulk', '/api/composer/batch-convos', '/api/composer/shuffle-convos')
+
+# Route classes in the order they are shed: a class is rejected once the delay
+# passes its multiple of the target
+SHED_THRESHOLDS = {
+    'bulk': 1,
+    'write': 2,
+    'auth': 4,
+    'read': 4,
+}
+
+DEFAULT_CLIENT_LIMITS = {
+    'read': {'rate': 20, 'burst': 40},
+    'auth': {'rate': 2, 'burst': 10},
+    'write': {'rate': 5, 'burst': 10},
+    'bulk': {'rate': 0.5, 'burst': 3},
+}
+
+# Per source address, checked before authentication. Looser than the per-user limits
+# because many users can share an address, except for the auth class, which has no
+# user to key on yet
+DEFAULT_ADDRESS_LIMITS = {
+    'read': {'rate': 200, 'burst': 400},
+    'auth': {'rate': 2, 'burst': 10},
+    'write': {'rate': 50, 'burst': 100},
+    'bulk': {'rate': 5, 'burst': 30},
+}
+
+
+def classify(method, path):
+    """
+    Map a request onto its route class: 'auth', 'read', 'write' or 'bulk'
+    """
+    if path in AUTH_PATHS:
+        return 'auth'
+    if path in BULK_PATHS:
+        return 'bulk'
+    if method in ('GET', 'HEAD'):
+        return 'read'
+    return 'write'
+
+
+def client_address(remote_addr, forwarded_for=None, trusted_hops=0):
+    """
+    Client address as seen by the nearest untrusted hop
+
+    X-Forwarded-For entries are appended by each proxy, so only the last
+    trusted_hops entries were written by infrastructure we run; anything to
+    their left is whatever the client sent.
+    """
+    if trusted_hops and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted_hops, len(hops))]
+    return remote_addr or ''
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        Take one token
+
+        Returns:
+            float: 0 if admitted, otherwise seconds until a token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate if self.rate else 60
+
+
+class RateLimiter:
+    """
+    Token buckets per (client, route class), plus optional global buckets per route class
+
+    Args:
+        client_limits (dict): {route_class: {'rate': per_second, 'burst': size}} applied to each client
+        global_limits (dict): Same shape, shared by all clients
+        maxsize (int): Client buckets kept before the least recently used are dropped
+    """
+
+    def __init__(self, client_limits=None, global_limits=None, maxsize=10000):
+        self.client_limits = client_limits if client_limits is not None else DEFAULT_CLIENT_LIMITS
+        self.global_buckets = {
+            route_class: TokenBucket(limit['rate'], limit['burst'])
+            for route_class, limit in (global_limits or {}).items()
+        }
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _client_bucket(self, client_key, route_class):
+        limit = self.client_limits.get(route_class)
+        if limit is None:
+            return None
+        key = (client_key, route_class)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(limit['rate'], limit['burst'])
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def check(self, client_key, route_class):
+        """
+        Returns:
+            float: 0 if admitted, otherwise the suggested Retry-After in seconds
+        """
+        bucket = self._client_bucket(client_key, route_class)
+        if bucket is not None:
+            wait = bucket.take()
+            if wait:
+                return wait
+        bucket = self.global_buckets.get(route_class)
+        return bucket.take() if bucket is not None else 0
+
+
+class LoadShedder:
+    """
+    Sheds route classes when the observed delay passes a target
+
+    The delay signal is a time-decayed moving average, so it falls back
+    towards zero while requests are being rejected and traffic recovers.
+
+    Args:
+        target (float): Target delay in seconds
+        window (float): Seconds over which old observations lose their weight
+    """
+
+    def __init__(self, target=0.5, window=5.0):
+        self.target = target
+        self.window = window
+        self._delay = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now):
+        return self._delay * math.exp(-(now - self._updated) / self.window)
+
+    def observe(self, delay):
+        with self._lock:
+            now = time.monotonic()
+            self._delay = self._decayed(now) * 0.9 + delay * 0.1
+            self._updated = now
+
+    @property
+    def delay(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def check(self, route_class):
+        """
+        Returns:
+            float: 0 if admitted, otherwise the suggested Retry-After in seconds
+        """
+        if not self.target:
+            return 0
+        delay = self.delay
+        if delay > self.target * SHED_THRESHOLDS.get(route_class, 1):
+            return max(1, math.ceil(delay))
+        return 0
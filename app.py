@@ -1,16 +1,35 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields, reqparse
-import requests
+from werkzeug.exceptions import HTTPException
+from requests.adapters import HTTPAdapter
 import os
+import json
 import uuid
+import math
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from secrets_manager import get_service_secrets
+from secrets_manager import get_service_secrets, add_refresh_listener, start_background_refresh
+from cache import create_cache
+from auth_cache import AuthCache
+from structured_logging import configure_logging, update_logging, log_body
+from conditional import conditional_body, invalidate
+from admission import RateLimiter, LoadShedder, classify, client_address, DEFAULT_CLIENT_LIMITS, DEFAULT_ADDRESS_LIMITS
+from scheduling import PriorityScheduler, QueueTimeout, pool_for
+from cors import init_preflight, parse_origins
+from upload_status import UploadStatusStore, summarize
+from batching import MicroBatcher, BulkRejected, BulkUnsupported
+from readiness import Readiness
+from concurrency import ConcurrencyLimits, Overloaded, OVERLOAD_STATUSES
+from routes import Route, RouteTable
+from profiling import TimedSession, RouteTimings, SamplingProfiler, timed
+from serialization import dumps, init_json
+from compression import init_compression
 import jwt
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, expose_headers=["Authorization"])
 app.debug = True
 
 # Initialize Flask-RestX
@@ -23,10 +42,16 @@ api = Api(app,
 
 ns = api.namespace('api', description='Gnosis Composer operations')
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
 secrets = get_service_secrets('gnosis-composer')
 
+configure_logging(
+    level=secrets.get('LOG_LEVEL', 'INFO'),
+    default_sample_rate=float(secrets.get('LOG_SAMPLE_RATE', 1.0)),
+    sample_rates=secrets.get('LOG_SAMPLE_RATES', {}),
+    body_limit=int(secrets.get('LOG_BODY_LIMIT', 512)),
+    app=app
+)
+
 C_PORT = int(secrets.get('PORT', 5000))
 API_KEY = secrets.get('API_KEY')
 
@@ -35,13 +60,236 @@ AUTH_SERVICE_URL = secrets.get('AUTH_SERVICE_URL', 'http://localhost:5007')
 CONVERSATION_SERVICE_URL = secrets.get('CONVERSATION_SERVICE_URL', 'http://localhost:5000')
 UPLOAD_SERVICE_URL = secrets.get('UPLOAD_SERVICE_URL', 'http://localhost:5002')
 
+# Rotated secrets are applied in place, no restart needed
+SECRETS_REFRESH_INTERVAL = int(secrets.get('SECRETS_REFRESH_INTERVAL', 300))
+
+def apply_secrets(all_secrets):
+    global API_KEY, AUTH_SERVICE_URL, CONVERSATION_SERVICE_URL, UPLOAD_SERVICE_URL
+    service_secrets = all_secrets.get('gnosis-composer', {})
+    API_KEY = service_secrets.get('API_KEY')
+    AUTH_SERVICE_URL = service_secrets.get('AUTH_SERVICE_URL', 'http://localhost:5007')
+    CONVERSATION_SERVICE_URL = service_secrets.get('CONVERSATION_SERVICE_URL', 'http://localhost:5000')
+    UPLOAD_SERVICE_URL = service_secrets.get('UPLOAD_SERVICE_URL', 'http://localhost:5002')
+    logging.info("Applied refreshed secrets")
+
+add_refresh_listener(apply_secrets)
+if SECRETS_REFRESH_INTERVAL:
+    start_background_refresh(SECRETS_REFRESH_INTERVAL)
+
+# CORS: CORS_ORIGINS is '*' or a list (or comma-separated string) of allowed origins.
+# Preflights are answered before any other hook and cached by browsers for CORS_MAX_AGE seconds
+CORS_ORIGINS = parse_origins(secrets.get('CORS_ORIGINS', '*'))
+CORS_MAX_AGE = int(secrets.get('CORS_MAX_AGE', 7200))
+
+CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, supports_credentials=True, expose_headers=["Authorization"], max_age=CORS_MAX_AGE)
+init_preflight(app, origins=CORS_ORIGINS, max_age=CORS_MAX_AGE)
+
+# Response encoding: JSON_BACKEND is 'auto', 'orjson' or 'json'
+init_json(app, api, backend=secrets.get('JSON_BACKEND', 'auto'))
+init_compression(
+    app,
+    enabled=str(secrets.get('COMPRESSION_ENABLED', 'true')).lower() == 'true',
+    min_size=int(secrets.get('COMPRESSION_MIN_SIZE', 1024)),
+    gzip_level=int(secrets.get('GZIP_LEVEL', 6)),
+    brotli_level=int(secrets.get('BROTLI_LEVEL', 4))
+)
+
 EXEMPT_ROUTES = ['/api/login', '/api/register', '/api/auth/google']
 
-# In-memory storage for upload status (in a real-world scenario, use a database)
-upload_status = {}
+# Admin and service-to-service routes are guarded by the service API key instead of a user token
+ADMIN_PREFIX = '/api/admin'
+SERVICE_ROUTES = ['/api/upload_callback', '/api/auth/events']
+
+# Cache backend shared by all workers: 'memory' (per process), 'shared' (per host) or 'redis'
+CACHE_BACKEND = secrets.get('CACHE_BACKEND', 'memory')
+CACHE_URL = secrets.get('CACHE_URL')
+TOKEN_CACHE_TTL = int(secrets.get('TOKEN_CACHE_TTL', 60))
+
+PROFILE_CACHE_TTL = int(secrets.get('PROFILE_CACHE_TTL', 300))
+
+# Tokens and user profiles learned from login and token validation responses
+auth_cache = AuthCache(
+    token_cache=create_cache(CACHE_BACKEND, 'tokens', maxsize=10000, ttl=TOKEN_CACHE_TTL, url=CACHE_URL),
+    profile_cache=create_cache(CACHE_BACKEND, 'profiles', maxsize=10000, ttl=PROFILE_CACHE_TTL, url=CACHE_URL),
+    token_ttl=TOKEN_CACHE_TTL
+)
+
+# How long a remembered ETag may answer If-None-Match with 304 without asking upstream
+CONVERSATION_ETAG_TTL = int(secrets.get('CONVERSATION_ETAG_TTL', 10))
+UPLOAD_STATUS_ETAG_TTL = int(secrets.get('UPLOAD_STATUS_ETAG_TTL', 2))
+
+validator_cache = create_cache(CACHE_BACKEND, 'validators', maxsize=10000, ttl=CONVERSATION_ETAG_TTL, url=CACHE_URL)
+
+def upstream_backends():
+    return {'auth': AUTH_SERVICE_URL, 'conversation': CONVERSATION_SERVICE_URL, 'upload': UPLOAD_SERVICE_URL}
+
+# Adaptive per-backend concurrency: in-flight calls to each backend grow while latency
+# holds and are cut when it rises; calls over the limit wait CONCURRENCY_QUEUE_TIMEOUT, then fail
+UPSTREAM_POOL_SIZE = int(secrets.get('UPSTREAM_POOL_SIZE', 32))
+UPSTREAM_TIMEOUT = float(secrets.get('UPSTREAM_TIMEOUT', 30))
+UPLOAD_TIMEOUT = float(secrets.get('UPLOAD_TIMEOUT', 120))
+ADAPTIVE_CONCURRENCY = str(secrets.get('ADAPTIVE_CONCURRENCY', 'true')).lower() == 'true'
+concurrency_limits = ConcurrencyLimits(
+    upstream_backends,
+    initial=int(secrets.get('CONCURRENCY_INITIAL_LIMIT', 10)),
+    min_limit=int(secrets.get('CONCURRENCY_MIN_LIMIT', 2)),
+    max_limit=int(secrets.get('CONCURRENCY_MAX_LIMIT', UPSTREAM_POOL_SIZE)),
+    tolerance=float(secrets.get('CONCURRENCY_TOLERANCE', 2.0)),
+    queue_timeout=float(secrets.get('CONCURRENCY_QUEUE_TIMEOUT', 2)),
+    max_queue=int(secrets.get('CONCURRENCY_MAX_QUEUE', 100))
+) if ADAPTIVE_CONCURRENCY else None
+
+# Shared upstream HTTP session; books upstream wait into per-request phase timings
+http = TimedSession(limits=concurrency_limits)
+http.mount('http://', HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+http.mount('https://', HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+
+# Readiness: the instance is ready once warm-up has opened pooled connections to each
+# backend and primed caches, and stays ready while backends answer health probes
+HEALTH_ROUTES = ['/healthz', '/readyz']
+readiness = Readiness(
+    http,
+    upstream_backends,
+    probe_path=secrets.get('HEALTH_PROBE_PATH', '/health'),
+    timeout=float(secrets.get('HEALTH_PROBE_TIMEOUT', 2)),
+    connections=int(secrets.get('WARMUP_CONNECTIONS', 4)),
+    # Probes share the connection pool but not the concurrency limits: a failed health
+    # check must not cut the limits production calls run under
+    request_options={'limited': False}
+)
+
+# Profiling: per-route phase timings, plus a sampling profiler switched on at runtime
+# through /api/admin/profile or for requests slower than PROFILE_SLOW_REQUEST_MS
+route_timings = RouteTimings()
+profiler = SamplingProfiler(interval=float(secrets.get('PROFILE_INTERVAL_MS', 5)) / 1000)
+if secrets.get('PROFILE_SLOW_REQUEST_MS'):
+    profiler.set_threshold(float(secrets['PROFILE_SLOW_REQUEST_MS']) / 1000)
+
+# Admission control: token buckets per client and route class, and load shedding
+# once scheduler queueing delay passes LOAD_SHED_TARGET_MS (bulk work is shed first)
+# Per-address buckets apply before authentication, per-user buckets once the token is
+# validated. TRUSTED_PROXY_HOPS is the number of our own proxies appending X-Forwarded-For
+rate_limiter = RateLimiter(
+    client_limits=secrets.get('RATE_LIMITS', DEFAULT_CLIENT_LIMITS),
+    global_limits=secrets.get('GLOBAL_RATE_LIMITS', {})
+)
+address_rate_limiter = RateLimiter(client_limits=secrets.get('ADDRESS_RATE_LIMITS', DEFAULT_ADDRESS_LIMITS))
+TRUSTED_PROXY_HOPS = int(secrets.get('TRUSTED_PROXY_HOPS', 0))
+load_shedder = LoadShedder(target=float(secrets.get('LOAD_SHED_TARGET_MS', 500)) / 1000)
+
+# Worker slots split between interactive, write and bulk pools so bulk work
+# never queues ahead of interactive requests
+scheduler = PriorityScheduler(
+    slots=int(secrets.get('SCHEDULER_SLOTS', 32)),
+    shares=secrets.get('SCHEDULER_SHARES'),
+    timeout=float(secrets.get('SCHEDULER_QUEUE_TIMEOUT', 10))
+)
+
+# Optional write-behind batching of conversation creates and replies: writes arriving
+# within BATCH_MAX_WAIT_MS are sent as one bulk request of up to BATCH_MAX_ITEMS
+WRITE_BATCHING = str(secrets.get('WRITE_BATCHING', 'false')).lower() == 'true'
+BATCH_MAX_ITEMS = int(secrets.get('BATCH_MAX_ITEMS', 20))
+BATCH_MAX_WAIT_MS = float(secrets.get('BATCH_MAX_WAIT_MS', 5))
+BATCH_RESULT_TIMEOUT = float(secrets.get('BATCH_RESULT_TIMEOUT', 30))
+BULK_UNSUPPORTED_STATUSES = (404, 405, 501)
+# Validation failures, usually over one invalid item; anything else would fail the single resends too
+BULK_REJECTED_STATUSES = (400, 422)
+
+def send_bulk(path, payload):
+    correlation_id = str(uuid.uuid4())
+    headers = {
+        'X-API-KEY': API_KEY,
+        'X-Correlation-ID': correlation_id
+    }
+    logging.info("Sending bulk request to %s with %d items, Correlation ID: %s", path, len(payload['items']), correlation_id)
+    response = http.post(f'{CONVERSATION_SERVICE_URL}{path}', json=payload, headers=headers, timeout=UPSTREAM_TIMEOUT)
+    if response.status_code in BULK_UNSUPPORTED_STATUSES:
+        raise BulkUnsupported(path)
+    if response.status_code in BULK_REJECTED_STATUSES:
+        # Resend singly so only the caller with the invalid item sees the error
+        raise BulkRejected(f'{path}: HTTP {response.status_code}')
+    if response.status_code in OVERLOAD_STATUSES:
+        # Every caller gets the error: resending singly would multiply load on a throttling backend
+        raise Overloaded(f'{path}: HTTP {response.status_code}')
+    response.raise_for_status()
+    return [(result.get('body'), result.get('status')) for result in response.json()['results']]
+
+def send_conversation_create(item):
+    headers = {
+        'X-API-KEY': API_KEY,
+        'X-Correlation-ID': item['correlation_id']
+    }
+    response = http.post(f'{CONVERSATION_SERVICE_URL}/api/convos', json=item['data'], headers=headers,
+                         timeout=item.get('timeout', UPSTREAM_TIMEOUT))
+    return response.json(), response.status_code
+
+def send_conversation_creates(items):
+    return send_bulk('/api/convos/bulk', {
+        'items': [item['data'] for item in items],
+        'correlation_ids': [item['correlation_id'] for item in items]
+    })
+
+def send_reply(item):
+    headers = {
+        'X-API-KEY': API_KEY,
+        'X-Correlation-ID': item['correlation_id']
+    }
+    response = http.put(
+        f"{CONVERSATION_SERVICE_URL}/api/convos/{item['conversation_id']}/reply",
+        json=item['data'],
+        headers=headers,
+        timeout=item.get('timeout', UPSTREAM_TIMEOUT)
+    )
+    return response.json(), response.status_code
+
+def send_replies(items):
+    return send_bulk('/api/convos/replies/bulk', {
+        'items': [dict(item['data'], conversation_id=item['conversation_id']) for item in items],
+        'correlation_ids': [item['correlation_id'] for item in items]
+    })
+
+create_batcher = reply_batcher = None
+if WRITE_BATCHING:
+    create_batcher = MicroBatcher('conversation-create', send_conversation_creates, send_conversation_create,
+                                  max_items=BATCH_MAX_ITEMS, max_wait=BATCH_MAX_WAIT_MS / 1000)
+    reply_batcher = MicroBatcher('conversation-reply', send_replies, send_reply,
+                                 max_items=BATCH_MAX_ITEMS, max_wait=BATCH_MAX_WAIT_MS / 1000)
+
+def submit_write(batcher, send_one, item):
+    """Send a write directly, or through its batcher when batching is on; returns (body, status)"""
+    if batcher is None:
+        return send_one(item)
+    return batcher.submit(item).result(timeout=BATCH_RESULT_TIMEOUT)
+
+# Upload statuses pushed by the upload service or seen on the way through. In-flight
+# states are served for UPLOAD_STATUS_TTL seconds, completed/failed ones until
+# UPLOAD_STATUS_TERMINAL_TTL. UPLOAD_STATUS_DB persists them and shares them between workers
+upload_status_store = UploadStatusStore(
+    maxsize=int(secrets.get('UPLOAD_STATUS_MAX_ENTRIES', 10000)),
+    ttl=float(secrets.get('UPLOAD_STATUS_TTL', 2)),
+    terminal_ttl=float(secrets.get('UPLOAD_STATUS_TERMINAL_TTL', 3600)),
+    db_path=secrets.get('UPLOAD_STATUS_DB')
+)
+
+def record_upload_status(upload_id, body):
+    try:
+        status = json.loads(body)
+    except ValueError:
+        return
+    if isinstance(status, dict) and 'status' in status:
+        upload_status_store.put(upload_id, status)
 
 def generate_correlation_id():
-    return str(uuid.uuid4())
+    g.correlation_id = str(uuid.uuid4())
+    return g.correlation_id
+
+def requires_api_key(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not API_KEY or request.headers.get('X-API-KEY') != API_KEY:
+            api.abort(403, 'Admin access required')
+        return f(*args, **kwargs)
+    return decorated
 
 # Model definitions
 register_model = api.model('Register', {
@@ -125,433 +373,497 @@ upload_status_response = api.model('UploadStatusResponse', {
     'file_size': fields.Integer(description='File size in bytes')
 })
 
-@ns.route('/register')
-class RegisterResource(Resource):
-    @api.doc('register_user')
-    @api.expect(register_model)
-    @api.marshal_with(login_response)
-    @api.response(201, 'User registered successfully')
-    @api.response(400, 'Missing required fields')    
-    @api.response(400, 'Username already exists')
-    @api.response(400, 'Email already exists')
-    @api.response(500, 'Registration failed')
-    @api.response(503, 'Authentication service unavailable')
-    def post(self):
-        if not api.payload or not all(k in api.payload for k in ['username', 'email', 'password']):
-            api.abort(400, 'Missing required fields')
+# Proxy routes. Hooks below hold the per-route validation and response shaping;
+# everything else (headers, timeouts, retries, caching, errors, metrics) comes from the route table
+AUTH_UNAVAILABLE = 'Authentication service unavailable'
+# Cache scope of every conversation list; any conversation write invalidates them all
+CONVERSATION_LISTS = 'conversation-lists'
 
-        try:
-            correlation_id = generate_correlation_id()
-            logging.info("Registering user: %s, Correlation ID: %s", api.payload.get('username'), correlation_id)
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
-            }
-            response = requests.post(f'{AUTH_SERVICE_URL}/api/register', json=api.payload, headers=headers)
-            
-            if response.status_code == 400:
-                error_msg = response.json().get('error')
-                logging.warning(f"Registration validation error: {error_msg}")
-                api.abort(400, error_msg)
-                
-            elif response.status_code == 500:
-                error_msg = response.json().get('error')
-                logging.error(f"Registration failed: {error_msg}")
-                api.abort(500, 'Registration failed')
-                
-            elif response.status_code == 201:
-                logging.info(f"User registered successfully: {api.payload.get('username')}")
-                return {
-                    'message': 'User registered successfully',
-                    'user': {
-                        'username': api.payload.get('username'),
-                        'email': api.payload.get('email')
-                    }
-                }, 201
-                
-            api.abort(response.status_code, response.json().get('error'))
-                        
-        except Exception as e:
-            logging.error("Registration error: %s", str(e))
-            api.abort(503, 'Authentication service unavailable')
+def upstream_headers():
+    return {
+        'X-API-KEY': API_KEY,
+        'X-Correlation-ID': generate_correlation_id()
+    }
 
-@ns.route('/login')
-class LoginResource(Resource):
-    @api.doc('login_user')
-    @api.expect(login_model)
-    @api.marshal_with(login_response)
-    @api.response(200, 'Login successful')
-    @api.response(400, 'Missing username or password')
-    @api.response(503, 'Authentication service unavailable')
-    def post(self):
-        if not api.payload or not all(k in api.payload for k in ['username', 'password']):
-            api.abort(400, 'Missing username or password')
+route_table = RouteTable(
+    api, ns, http,
+    backends=upstream_backends,
+    headers=upstream_headers,
+    cache=validator_cache,
+    retries=int(secrets.get('UPSTREAM_RETRIES', 2))
+)
 
-        try:
-            correlation_id = generate_correlation_id()
-            logging.info("Login attempt for user: %s, Correlation ID: %s", api.payload.get('username'), correlation_id)
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
+def prepare_register():
+    if not api.payload or not all(k in api.payload for k in ['username', 'email', 'password']):
+        api.abort(400, 'Missing required fields')
+    logging.info("Registering user: %s", api.payload.get('username'))
+    return {'json': api.payload}
+
+def respond_register(body, status, kwargs):
+    if status == 201:
+        logging.info("User registered successfully: %s", api.payload.get('username'))
+        return {
+            'message': 'User registered successfully',
+            'user': {
+                'username': api.payload.get('username'),
+                'email': api.payload.get('email')
             }
-            response = requests.post(f'{AUTH_SERVICE_URL}/api/login', json=api.payload, headers=headers)
-            
-            if response.status_code == 200:
-                logging.info("User logged in successfully: %s", api.payload.get('username'))
-                return {
-                    'message': 'Login successful',
-                    'user': {
-                        'username': api.payload.get('username'),
-                        'id': response.json().get('user').get('id')
-                    },
-                    'token': response.json().get('token')
-                }, 200
-            
-            api.abort(response.status_code, response.json().get('error'))
-                
-        except Exception as e:
-            logging.error("Login error: %s", str(e))
-            api.abort(503, 'Authentication service unavailable')
+        }, 201
+    if status == 500:
+        logging.error("Registration failed: %s", body.get('error'))
+        api.abort(500, 'Registration failed')
+    logging.warning("Registration rejected: %s", body.get('error'))
+    api.abort(status, body.get('error'))
 
+def prepare_login():
+    if not api.payload or not all(k in api.payload for k in ['username', 'password']):
+        api.abort(400, 'Missing username or password')
+    logging.info("Login attempt for user: %s", api.payload.get('username'))
+    return {'json': api.payload}
 
-@ns.route('/auth/google')
-class GoogleAuthResource(Resource):
-    @api.doc('google_auth')
-    @api.expect(google_auth_model)
-    @api.response(200, 'Authentication successful')
-    @api.response(503, 'Authentication service unavailable')
-    def post(self):
-        try:
-            correlation_id = generate_correlation_id()
-            auth_url = f'{AUTH_SERVICE_URL}/api/auth/google'
-            logging.info("=== Google Auth Debug ===")
-            logging.info(f"Auth URL: {auth_url}")
-            logging.info(f"Request Headers: {dict(request.headers)}")
-            logging.info(f"Request Body: {request.json}")
-            
-            response = requests.post(
-                auth_url,
-                headers={
-                    'Authorization': request.headers.get('Authorization'),
-                    'Content-Type': 'application/json',
-                    'X-API-KEY': API_KEY,
-                    'X-Correlation-ID': correlation_id  # Add correlation ID to headers
-                },
-                json=request.json,
-                timeout=10  # Add timeout to see if it's a connection issue
-            )
-            logging.info(f"Response Status: {response.status_code}")
-            logging.info(f"Response Body: {response.json()}")
-            return response.json(), response.status_code
-            
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Request failed: {str(e)}")
-            api.abort(503, f'Authentication service unavailable: {str(e)}')
-        except Exception as e:
-            logging.error(f"Unexpected error: {str(e)}")
-            api.abort(503, f'Authentication service unavailable: {str(e)}')
+def respond_login(body, status, kwargs):
+    if status != 200:
+        api.abort(status, body.get('error'))
+    logging.info("User logged in successfully: %s", api.payload.get('username'))
+    # A fresh login replaces the cached profile and pre-validates the new token
+    profile = (auth_cache.remember(body['token'], body.get('user')) if body.get('token') else body.get('user')) or {}
+    return {
+        'message': 'Login successful',
+        'user': {
+            'username': api.payload.get('username'),
+            'email': profile.get('email'),
+            'id': profile.get('id')
+        },
+        'token': body.get('token')
+    }, 200
 
-@ns.route('/convos')
-class ConversationCreateResource(Resource):
-    @api.doc('list_conversations')
-    @api.response(200, 'Success')
-    @api.response(400, 'Missing user_id')
-    @api.response(503, 'Conversation service unavailable')
+def prepare_google_auth():
+    return {
+        'json': request.json,
+        'headers': {
+            'Authorization': request.headers.get('Authorization'),
+            'Content-Type': 'application/json'
+        }
+    }
+
+def respond_google_auth(body, status, kwargs):
+    logging.debug("Google auth response: %s - %s", status, log_body(body))
+    if status == 200 and isinstance(body, dict) and body.get('token'):
+        auth_cache.remember(body['token'], body.get('user'))
+    return body, status
+
+def prepare_list_conversations():
+    user_id = request.args.get('user_id')
+    if not user_id:
+        api.abort(400, 'user_id is required')
+    return {'params': {
+        'user_id': user_id,
+        'limit': request.args.get('limit', 20),
+        'cursor': request.args.get('cursor'),
+        'refresh': request.args.get('refresh', 'false')
+    }}
+
+def prepare_create_conversation():
+    data = {
+        'user_id': (api.payload or {}).get('user_id'),
+        'content_id': (api.payload or {}).get('content_id'),
+        'content_chunk_id': (api.payload or {}).get('content_chunk_id')  # Optional field
+    }
+    if not data['user_id'] or not data['content_id']:
+        api.abort(400, 'user_id and content_id are required')
+    logging.info("Creating conversation with data: %s", data)
+    return {'json': data}
+
+def send_create_conversation(kwargs, headers, timeout):
+    return submit_write(create_batcher, send_conversation_create, {
+        'data': kwargs['json'],
+        'correlation_id': headers['X-Correlation-ID'],
+        'timeout': timeout
+    })
+
+def respond_create_conversation(body, status, kwargs):
+    if status in (200, 201):
+        logging.info("Conversation created successfully: %s", log_body(body))
+        return body, status
+    if status == 400:
+        logging.warning("Bad request to conversation service: %s", log_body(body))
+        return body, 400
+    logging.error("Unexpected response from conversation service: %s", log_body(body))
+    return {'error': 'Failed to create conversation'}, 500
+
+def prepare_reply(conversation_id):
+    data = {'message': (request.json or {}).get('message')}
+    logging.info("Adding reply to conversation %d with data: %s", conversation_id, log_body(data))
+    return {'json': data}
+
+def send_reply_to_conversation(kwargs, headers, timeout, conversation_id):
+    return submit_write(reply_batcher, send_reply, {
+        'conversation_id': conversation_id,
+        'data': kwargs['json'],
+        'correlation_id': headers['X-Correlation-ID'],
+        'timeout': timeout
+    })
+
+def prepare_shuffle():
+    if not request.json or 'user_id' not in request.json:
+        api.abort(400, 'user_id is required')
+    return {'json': {
+        'user_id': request.json['user_id'],
+        'volatility': request.json.get('volatility', 0.5)  # Optional parameter
+    }}
+
+def prepare_batch_conversations():
+    if not api.payload or 'user_id' not in api.payload:
+        logging.warning("user_id is required")
+        api.abort(400, 'user_id is required')
+    data = {
+        'user_id': api.payload['user_id'],
+        'num_convos': api.payload.get('num_convos', 10)  # Default to 10 if not specified
+    }
+    logging.info("Initiating batch conversation creation for user_id: %s, num_convos: %s", data['user_id'], data['num_convos'])
+    return {'json': data}
+
+def respond_batch_conversations(body, status, kwargs):
+    if status == 200:
+        return dict(kwargs['json'], message='Batch conversation creation initiated'), 200
+    error_message = body.get('error', 'Unknown error')
+    logging.error("Failed to create batch conversations: %s", error_message)
+    return {'error': error_message}, status
+
+def prepare_upload():
+    if 'file' not in request.files:
+        api.abort(400, 'No file part in the request')
+    user_id = request.form.get('user_id')
+    if not user_id:
+        api.abort(400, 'user_id is required')
+
+    file = request.files['file']
+    logging.info("Uploading file for user_id: %s", user_id)
+    return {
+        'files': {'file': (file.filename, file.read(), file.content_type)},
+        'data': {'user_id': user_id}
+    }
+
+def respond_upload(body, status, kwargs):
+    if status == 202 and body.get('upload_id') and 'status' in body:
+        upload_status_store.put(body['upload_id'], body)
+    return body, status
+
+def local_upload_status(upload_id):
+    status = upload_status_store.get(upload_id)
+    return None if status is None else conditional_body(dumps(status))
+
+route_table.compile([
+    Route('/register', 'POST', 'auth', timeout=UPSTREAM_TIMEOUT, prepare=prepare_register, respond=respond_register,
+          unavailable=AUTH_UNAVAILABLE, doc={
+              'name': 'register_user', 'expect': register_model, 'marshal': login_response,
+              'responses': {201: 'User registered successfully', 400: 'Missing required fields',
+                            500: 'Registration failed', 503: AUTH_UNAVAILABLE}}),
+    Route('/login', 'POST', 'auth', timeout=UPSTREAM_TIMEOUT, prepare=prepare_login, respond=respond_login,
+          unavailable=AUTH_UNAVAILABLE, doc={
+              'name': 'login_user', 'expect': login_model, 'marshal': login_response,
+              'responses': {200: 'Login successful', 400: 'Missing username or password', 503: AUTH_UNAVAILABLE}}),
+    Route('/auth/google', 'POST', 'auth', timeout=10, prepare=prepare_google_auth, respond=respond_google_auth,
+          unavailable=AUTH_UNAVAILABLE, doc={
+              'name': 'google_auth', 'expect': google_auth_model,
+              'responses': {200: 'Authentication successful', 503: AUTH_UNAVAILABLE}}),
+    Route('/convos', 'GET', 'conversation', timeout=UPSTREAM_TIMEOUT, cache_ttl=CONVERSATION_ETAG_TTL, streaming=True,
+          cache_scope=CONVERSATION_LISTS, prepare=prepare_list_conversations, doc={
+              'name': 'list_conversations', 'summary': 'Get list of conversations',
+              'responses': {200: 'Success', 400: 'Missing user_id', 503: 'Conversation service unavailable'}}),
+    Route('/convos', 'POST', 'conversation', timeout=UPSTREAM_TIMEOUT, prepare=prepare_create_conversation,
+          send=send_create_conversation, respond=respond_create_conversation, invalidates_scope=CONVERSATION_LISTS, doc={
+              'name': 'create_conversation', 'expect': conversation_model,
+              'responses': {201: 'Conversation created successfully', 400: 'Invalid request', 500: 'Server error'}}),
+    Route('/convos/<int:conversation_id>', 'GET', 'conversation', timeout=UPSTREAM_TIMEOUT,
+          cache_ttl=CONVERSATION_ETAG_TTL, streaming=True, doc={'name': 'get_conversation'}),
+    Route('/convos/<int:conversation_id>', 'DELETE', 'conversation', timeout=UPSTREAM_TIMEOUT,
+          invalidates='/api/convos/{conversation_id}', invalidates_scope=CONVERSATION_LISTS,
+          doc={'name': 'delete_conversation'}),
+    Route('/convos/<int:conversation_id>/reply', 'PUT', 'conversation', timeout=UPSTREAM_TIMEOUT,
+          # Replies append a message, so a retried PUT could post it twice
+          idempotent=False, prepare=prepare_reply, send=send_reply_to_conversation,
+          invalidates='/api/convos/{conversation_id}', invalidates_scope=CONVERSATION_LISTS,
+          doc={'name': 'add_reply', 'expect': reply_model}),
+    Route('/composer/shuffle-convos', 'POST', 'conversation', upstream='/api/convos/shuffle', timeout=UPSTREAM_TIMEOUT,
+          prepare=prepare_shuffle, invalidates_scope=CONVERSATION_LISTS, doc={
+              'name': 'shuffle_conversations', 'expect': shuffle_model,
+              'responses': {200: 'Success', 400: 'Missing user_id', 503: 'Conversation service unavailable'}}),
+    Route('/composer/batch-convos', 'POST', 'conversation', upstream='/api/convos/batch', timeout=UPSTREAM_TIMEOUT,
+          prepare=prepare_batch_conversations, respond=respond_batch_conversations,
+          invalidates_scope=CONVERSATION_LISTS, doc={
+              'name': 'create_batch_conversations', 'expect': batch_model,
+              'responses': {200: 'Batch conversation creation initiated', 400: 'Missing user_id',
+                            503: 'Conversation service unavailable'}}),
+    Route('/upload', 'POST', 'upload', timeout=UPLOAD_TIMEOUT, prepare=prepare_upload, respond=respond_upload, doc={
+        'name': 'upload_file', 'expect': upload_model,
+        'responses': {202: 'Upload accepted', 400: 'Invalid request', 503: 'Upload service unavailable'}}),
+    Route('/upload_status/<string:upload_id>', 'GET', 'upload', timeout=UPSTREAM_TIMEOUT,
+          cache_ttl=UPLOAD_STATUS_ETAG_TTL, streaming=True, local=local_upload_status,
+          # Status bodies are small; fetch them uncompressed so they can be recorded
+          prepare=lambda upload_id: {'headers': {'Accept-Encoding': 'identity'}},
+          on_body=lambda body, upload_id: record_upload_status(upload_id, body), doc={
+              'name': 'get_upload_status', 'expect': upload_status_model,
+              'responses': {200: 'Success', 503: 'Upload service unavailable'}}),
+])
+
+@ns.route('/admin/routes')
+class RoutesResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('get_routes')
     def get(self):
-        """Get list of conversations"""
-        user_id = request.args.get('user_id')
-        limit = request.args.get('limit', 20)
-        cursor = request.args.get('cursor')
-        refresh = request.args.get('refresh', 'false')
+        """Route table with per-route call, retry, failure and status counts"""
+        return route_table.report(), 200
+
+
+# Bulk uploads: files from one multipart request are forwarded to the upload service
+# BULK_UPLOAD_PARALLELISM at a time; the upload backend's concurrency limit applies on top
+BULK_UPLOAD_PARALLELISM = int(secrets.get('BULK_UPLOAD_PARALLELISM', 4))
+BULK_UPLOAD_MAX_FILES = int(secrets.get('BULK_UPLOAD_MAX_FILES', 100))
+bulk_upload_cache = create_cache(CACHE_BACKEND, 'bulk_uploads', maxsize=1000,
+                                 ttl=float(secrets.get('BULK_UPLOAD_TTL', 3600)), url=CACHE_URL)
+
+def request_user_id():
+    """Id of the user whose token authenticated the current request"""
+    return (getattr(request, 'user', None) or {}).get('id')
+
+def file_headers(headers):
+    """Upstream headers for one file of a bulk upload: each file gets its own correlation ID"""
+    return dict(headers, **{'X-Correlation-ID': str(uuid.uuid4())})
+
+def is_unavailable(upload):
+    """Whether a failed file was never judged by the upload service: unreachable, shed or overloaded"""
+    return upload['status_code'] >= 500 or upload['status_code'] in OVERLOAD_STATUSES
+
+def forward_upload(file, user_id, headers):
+    upload = {'file_name': file.filename}
+    logging.info("Forwarding bulk upload file %s, Correlation ID: %s", file.filename, headers['X-Correlation-ID'])
+    try:
+        # Werkzeug has already spooled the part to a temporary file; stream it from there
+        response = http.post(f'{UPLOAD_SERVICE_URL}/api/upload',
+                             files={'file': (file.filename, file.stream, file.content_type)},
+                             data={'user_id': user_id},
+                             headers=headers,
+                             timeout=UPLOAD_TIMEOUT)
+        body = response.json()
+    except Exception as e:
+        logging.error("Bulk upload of %s failed: %s", file.filename, str(e))
+        return dict(upload, error='Upload service unavailable', status_code=503)
+
+    if response.status_code != 202 or not body.get('upload_id'):
+        return dict(upload, error=body.get('error') or body.get('message') or f'HTTP {response.status_code}',
+                    status_code=response.status_code)
+    if 'status' in body:
+        upload_status_store.put(body['upload_id'], body)
+    return dict(upload, upload_id=body['upload_id'])
+
+def fetch_upload_status(upload_id, headers):
+    try:
+        response = http.get(f'{UPLOAD_SERVICE_URL}/api/upload_status/{upload_id}', headers=headers, timeout=UPSTREAM_TIMEOUT)
+    except Exception as e:
+        logging.error("Status check for %s failed: %s", upload_id, str(e))
+        return None
+    if response.status_code == 200:
+        record_upload_status(upload_id, response.content)
+    return upload_status_store.get(upload_id)
+
+bulk_upload_model = api.model('BulkUpload', {
+    'user_id': fields.String(required=True, description='User ID'),
+    'files': fields.List(fields.Raw, required=True, description='Files to upload, any number of multipart file parts')
+})
+
+@ns.route('/upload/bulk')
+class BulkUploadResource(Resource):
+    @api.doc('bulk_upload_files')
+    @api.expect(bulk_upload_model)
+    @api.response(202, 'Uploads accepted')
+    @api.response(400, 'Invalid request, or every file was rejected')
+    @api.response(413, 'Too many files')
+    @api.response(503, 'Upload service unavailable')
+    def post(self):
+        """Upload many files in one request; returns an upload_id per file and a bulk_id for combined progress"""
+        files = [file for _, file in request.files.items(multi=True)]
+        if not files:
+            api.abort(400, 'No files in the request')
+        if len(files) > BULK_UPLOAD_MAX_FILES:
+            api.abort(413, f'At most {BULK_UPLOAD_MAX_FILES} files per bulk upload')
 
+        user_id = request.form.get('user_id')
         if not user_id:
             api.abort(400, 'user_id is required')
 
-        try:
-            correlation_id = generate_correlation_id()
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
-            }
-            
-            # Forward the request to conversation service with all query params
-            response = requests.get(
-                f'{CONVERSATION_SERVICE_URL}/api/convos',
-                params={
-                    'user_id': user_id,
-                    'limit': limit,
-                    'cursor': cursor,
-                    'refresh': refresh
-                },
-                headers=headers
-            )
-            
-            return response.json(), response.status_code
-            
-        except Exception as e:
-            logging.error(f"Error fetching conversations: {str(e)}")
-            api.abort(503, 'Conversation service unavailable')
-                      
-    @api.doc('create_conversation')
-    @api.expect(conversation_model)
-    @api.response(201, 'Conversation created successfully')
-    @api.response(400, 'Invalid request')
-    @api.response(500, 'Server error')
-    def post(self):
-        # Get data from api.payload instead of request.json when using flask-restx
-        data = {
-            'user_id': api.payload.get('user_id'),
-            'content_id': api.payload.get('content_id'),
-            'content_chunk_id': api.payload.get('content_chunk_id')  # Optional field
-        }
+        bulk_id = str(uuid.uuid4())
+        headers = upstream_headers()
+        logging.info("Bulk upload %s of %d files for user_id: %s, Correlation ID: %s",
+                     bulk_id, len(files), user_id, headers['X-Correlation-ID'])
+        with ThreadPoolExecutor(max_workers=min(BULK_UPLOAD_PARALLELISM, len(files))) as executor:
+            uploads = list(executor.map(lambda file: forward_upload(file, user_id, file_headers(headers)), files))
 
-        # Validate required fields
-        if not data['user_id'] or not data['content_id']:
-            return {'error': 'user_id and content_id are required'}, 400
+        if not any('upload_id' in upload for upload in uploads):
+            rejected = sorted({upload['status_code'] for upload in uploads if not is_unavailable(upload)})
+            if not rejected:
+                return {'message': 'Upload service unavailable', 'uploads': uploads}, 503
+            # Files the upload service turned down will fail again on retry, so this is not a 503
+            status = rejected[0] if len(rejected) == 1 and 400 <= rejected[0] < 500 else 400
+            return {'message': 'No file was accepted', 'uploads': uploads}, status
+        bulk_upload_cache.set(bulk_id, {'user_id': user_id, 'owner': request_user_id(), 'uploads': uploads})
+        return {'bulk_id': bulk_id, 'progress_url': f'/api/upload/bulk/{bulk_id}', 'uploads': uploads}, 202
 
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        
-        logging.info("Creating conversation with data: %s, Correlation ID: %s", data, correlation_id)
-        
-        try:
-            response = requests.post(
-                f'{CONVERSATION_SERVICE_URL}/api/convos',
-                json=data,
-                headers=headers
-            )
-            
-            if response.status_code == 201 or response.status_code == 200:  # Success status from conversation service
-                logging.info("Conversation created successfully: %s", response.json())
-                return response.json(), response.status_code
-            elif response.status_code == 400:  # Bad request
-                logging.warning("Bad request to conversation service: %s", response.json())
-                return response.json(), 400
-            else:
-                logging.error("Unexpected response from conversation service: %s", response.json())
-                return {'error': 'Failed to create conversation'}, 500
-                
-        except Exception as e:
-            logging.error("Error creating conversation: %s", str(e))
-            return {'error': 'Failed to create conversation'}, 500
-
-@ns.route('/convos/<int:conversation_id>')
-class ConversationResource(Resource):
-    @api.doc('get_conversation')
-    @api.expect(conversation_model)
-    def get(self, conversation_id):
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        response = requests.get(f'{CONVERSATION_SERVICE_URL}/api/convos/{conversation_id}', headers=headers)
-        return response.json(), response.status_code
-
-    @api.doc('delete_conversation')
-    def delete(self, conversation_id):
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        logging.info("Deleting conversation with ID: %d, Correlation ID: %s", conversation_id, correlation_id)
-        response = requests.delete(f'{CONVERSATION_SERVICE_URL}/api/convos/{conversation_id}', headers=headers)
-        logging.info("Delete conversation response: %s", response.json())
-        return response.json(), response.status_code
-
-@ns.route('/convos')
-class ConversationCreateResource(Resource):
-    @api.doc('create_conversation')
-    @api.expect(conversation_model)
-    def post(self):
-        data = {
-            'user_id': request.json.get('user_id'),
-            'content_id': request.json.get('content_id')
-        }
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        logging.info("Creating conversation with data: %s, Correlation ID: %s", data, correlation_id)
-        response = requests.post(f'{CONVERSATION_SERVICE_URL}/api/convos', json=data, headers=headers)
-        logging.info("Create conversation response: %s", response.json())
-        return response.json(), response.status_code
-
-@ns.route('/convos/<int:conversation_id>/reply')
-class ConversationReplyResource(Resource):
-    @api.doc('add_reply')
-    @api.expect(reply_model)
-    def put(self, conversation_id):
-        data = {
-            'message': request.json.get('message')
-        }
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        logging.info("Adding reply to conversation %d with data: %s, Correlation ID: %s", conversation_id, data, correlation_id)
-        response = requests.put(
-            f'{CONVERSATION_SERVICE_URL}/api/convos/{conversation_id}/reply',
-            json=data,
-            headers=headers
-        )
-        logging.info("Add reply response: %s", response.json())
-        return response.json(), response.status_code
-
-@ns.route('/composer/shuffle-convos')
-class ShuffleConversationsResource(Resource):
-    @api.doc('shuffle_conversations')
-    @api.expect(shuffle_model)
+@ns.route('/upload/bulk/<string:bulk_id>')
+class BulkUploadProgressResource(Resource):
+    @api.doc('get_bulk_upload_progress')
     @api.response(200, 'Success')
-    @api.response(400, 'Missing user_id')
-    @api.response(500, 'Server error')
-    def post(self):
-        if not request.json or 'user_id' not in request.json:
-            api.abort(400, 'user_id is required')
+    @api.response(404, 'Unknown bulk upload')
+    def get(self, bulk_id):
+        """Combined progress of a bulk upload, with each file's latest status"""
+        bulk = bulk_upload_cache.get(bulk_id)
+        # Someone else's bulk upload is reported as unknown, not forbidden, so its id is not confirmed
+        if bulk is None or bulk.get('owner') != request_user_id():
+            api.abort(404, 'Unknown bulk upload')
 
-        user_id = request.json['user_id']
-        volatility = request.json.get('volatility', 0.5)  # Optional parameter
+        uploads = [
+            dict(upload, status=upload_status_store.get(upload['upload_id'])) if 'upload_id' in upload else dict(upload)
+            for upload in bulk['uploads']
+        ]
+        missing = [upload for upload in uploads if 'upload_id' in upload and upload['status'] is None]
+        if missing:
+            headers = upstream_headers()
+            with ThreadPoolExecutor(max_workers=min(BULK_UPLOAD_PARALLELISM, len(missing))) as executor:
+                statuses = executor.map(lambda upload: fetch_upload_status(upload['upload_id'], file_headers(headers)), missing)
+                for upload, status in zip(missing, statuses):
+                    upload['status'] = status
 
-        try:
-            correlation_id = generate_correlation_id()
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
-            }
-            # Forward request to conversation service
-            response = requests.post(
-                f'{CONVERSATION_SERVICE_URL}/api/convos/shuffle',
-                json={
-                    'user_id': user_id,
-                    'volatility': volatility
-                },
-                headers=headers
-            )
-            return response.json(), response.status_code
-        except Exception as e:
-            logging.error(f"Error requesting conversation shuffle: {e}")
-            api.abort(500, 'Failed to request conversation shuffle')
-
-@ns.route('/composer/batch-convos')  # Match the URL used in the test
-class BatchConversationsResource(Resource):
-    @api.doc('create_batch_conversations')
-    @api.expect(batch_model)
-    @api.response(202, 'Batch conversation creation initiated')
-    @api.response(400, 'Missing user_id')
-    @api.response(500, 'Server error')
+        return conditional_body(dumps(dict(summarize(uploads), bulk_id=bulk_id, uploads=uploads)))
+
+auth_event_model = api.model('AuthEvent', {
+    'event': fields.String(required=True, description='Event type', enum=['user_updated', 'user_deleted', 'logout', 'token_revoked']),
+    'user_id': fields.Integer(description='Affected user'),
+    'user': fields.Raw(description='Updated profile for user_updated'),
+    'token': fields.String(description='Revoked token for token_revoked')
+})
+
+@ns.route('/auth/events')
+class AuthEventResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('auth_event')
+    @api.expect(auth_event_model)
+    @api.response(200, 'Event applied')
+    @api.response(400, 'Invalid event')
     def post(self):
-        if not api.payload or 'user_id' not in api.payload:
-            logging.warning("user_id is required")
-            api.abort(400, 'user_id is required')
+        """Receive user and token changes pushed by the auth service"""
+        event = api.payload or {}
+        kind = event.get('event')
+        user_id = event.get('user_id') or (event.get('user') or {}).get('id')
 
-        user_id = api.payload['user_id']
-        num_convos = api.payload.get('num_convos', 10)  # Default to 10 if not specified
+        if kind == 'token_revoked' and event.get('token'):
+            auth_cache.forget_token(event['token'])
+        elif kind == 'user_updated' and (event.get('user') or {}).get('id') is not None:
+            auth_cache.update_profile(event['user'])
+        elif kind in ('user_updated', 'user_deleted', 'logout') and user_id is not None:
+            auth_cache.forget_user(user_id)
+        else:
+            api.abort(400, 'Invalid auth event')
+        return {'applied': kind}, 200
 
-        try:
-            correlation_id = generate_correlation_id()
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
-            }
-            
-            logging.info(f"Initiating batch conversation creation for user_id: {user_id}, num_convos: {num_convos}")
-            
-            # Send request to conversation service to create batch conversations
-            response = requests.post(
-                f"{CONVERSATION_SERVICE_URL}/api/convos/batch",
-                json={
-                    'user_id': user_id,
-                    'num_convos': num_convos
-                },
-                headers=headers
-            )
-
-            logging.info(f"Batch conversation response: {response.status_code} - {response.text}")
-
-            if response.status_code == 200:
-                return {
-                    "message": "Batch conversation creation initiated",
-                    "user_id": user_id,
-                    "num_convos": num_convos
-                }, 200
-            else:
-                error_message = response.json().get('error', 'Unknown error')
-                logging.error(f"Failed to create batch conversations: {error_message}")
-                return {"error": error_message}, response.status_code
-
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Network error in batch conversation creation: {str(e)}")
-            return {"error": "Failed to connect to conversation service"}, 503
-        except Exception as e:
-            logging.error(f"Error requesting batch conversation creation: {str(e)}")
-            return {"error": "Internal server error"}, 500
-
-@ns.route('/upload')
-class UploadResource(Resource):
-    @api.doc('upload_file')
-    @api.expect(upload_model)
-    @api.response(202, 'Upload accepted')
-    @api.response(400, 'Invalid request')
-    @api.response(503, 'Upload service unavailable')
+@ns.route('/upload_callback')
+class UploadStatusCallbackResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('upload_status_callback')
+    @api.expect(upload_status_response)
+    @api.response(200, 'Status recorded')
+    @api.response(400, 'Missing upload_id')
     def post(self):
-        if 'file' not in request.files:
-            api.abort(400, 'No file part in the request')
+        """Receive status updates pushed by the upload service"""
+        updates = api.payload if isinstance(api.payload, list) else [api.payload or {}]
+        if not all(isinstance(update, dict) and update.get('upload_id') for update in updates):
+            api.abort(400, 'upload_id is required')
 
-        file = request.files['file']
-        user_id = request.form.get('user_id')
+        for update in updates:
+            upload_status_store.put(update['upload_id'], update)
+            invalidate(validator_cache, f"/api/upload_status/{update['upload_id']}")
+        return {'received': len(updates)}, 200
 
-        if not user_id:
-            api.abort(400, 'user_id is required')
+logging_settings_model = api.model('LoggingSettings', {
+    'level': fields.String(description='Root log level'),
+    'default_sample_rate': fields.Float(description='Fraction of sub-warning records kept by default'),
+    'sample_rates': fields.Raw(description='Per-route sample rates keyed by route rule'),
+    'body_limit': fields.Integer(description='Maximum logged body size in characters')
+})
 
-        # Forward to content processor service
-        files = {'file': (file.filename, file.read(), file.content_type)}
-        data = {'user_id': user_id}
-        correlation_id = generate_correlation_id()
-        headers = {
-            'X-API-KEY': API_KEY,
-            'X-Correlation-ID': correlation_id
-        }
-        logging.info(f"Uploading file for user_id: {user_id}, Correlation ID: {correlation_id}")
+@ns.route('/admin/logging')
+class LoggingSettingsResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('get_logging_settings')
+    def get(self):
+        return update_logging(), 200
+
+    @api.doc('update_logging_settings')
+    @api.expect(logging_settings_model)
+    @api.response(400, 'Invalid logging settings')
+    def put(self):
         try:
-            response = requests.post(f'{UPLOAD_SERVICE_URL}/api/upload',
-                                   files=files,
-                                   data=data,
-                                   headers=headers)
+            return update_logging(**(api.payload or {})), 200
+        except (TypeError, ValueError) as e:
+            api.abort(400, str(e))
+
+profile_model = api.model('ProfileSession', {
+    'seconds': fields.Float(description='Sample every request for this many seconds'),
+    'threshold_ms': fields.Float(description='Keep samples of requests slower than this; null disables')
+})
 
-            if response.status_code == 202:                
-                return response.json(), response.status_code
-            else:
-                return response.json(), response.status_code
+@ns.route('/admin/profile')
+class ProfileResource(Resource):
+    method_decorators = [requires_api_key]
 
-        except Exception as e:
-            logging.error(f"Upload request failed: {str(e)}")
-            api.abort(503, 'Upload service unavailable')
-
-@ns.route('/upload_status/<string:upload_id>')
-class UploadStatusResource(Resource):
-    @api.doc('get_upload_status')
-    @api.expect(upload_status_model)
-    # @api.marshal_with(upload_status_response)
-    @api.response(200, 'Success')
-    @api.response(503, 'Upload service unavailable') 
-    def get(self, upload_id):
+    @api.doc('get_profile', params={'route': 'Only return stacks for this route rule', 'format': "'collapsed' (default) or 'status'"})
+    def get(self):
+        if request.args.get('format') == 'status':
+            return profiler.status(), 200
+        return app.response_class(profiler.collapsed(request.args.get('route')), mimetype='text/plain')
+
+    @api.doc('start_profile')
+    @api.expect(profile_model)
+    @api.response(400, 'Invalid profiling request')
+    def post(self):
+        payload = api.payload or {}
         try:
-            correlation_id = generate_correlation_id()
-            headers = {
-                'X-API-KEY': API_KEY,
-                'X-Correlation-ID': correlation_id
-            }
-            response = requests.get(f'{UPLOAD_SERVICE_URL}/api/upload_status/{upload_id}', headers=headers)
-            return response.json(), response.status_code
-        except Exception as e:
-            logging.error(f"Status check failed: {str(e)}")
-            api.abort(503, 'Upload service unavailable')
+            if 'threshold_ms' in payload:
+                threshold = payload['threshold_ms']
+                profiler.set_threshold(None if threshold is None else float(threshold) / 1000)
+            if payload.get('seconds'):
+                profiler.start(float(payload['seconds']))
+        except (TypeError, ValueError) as e:
+            api.abort(400, str(e))
+        return profiler.status(), 200
+
+    @api.doc('reset_profile')
+    def delete(self):
+        profiler.reset()
+        route_timings.reset()
+        return profiler.status(), 200
+
+@ns.route('/admin/concurrency')
+class ConcurrencyResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('get_concurrency', params={'history': "'false' to omit the limit history"})
+    def get(self):
+        """Current per-backend concurrency limits, in-flight and queued calls, and limit history"""
+        if concurrency_limits is None:
+            return {}, 200
+        return concurrency_limits.snapshot(history=request.args.get('history', 'true') != 'false'), 200
+
+@ns.route('/admin/timings')
+class TimingsResource(Resource):
+    method_decorators = [requires_api_key]
+
+    @api.doc('get_timings')
+    def get(self):
+        return route_timings.report(), 200
 
 # Authentication middleware
 def requires_auth(f):
@@ -565,6 +877,11 @@ def requires_auth(f):
             api.abort(401, 'Missing or invalid authorization header')
         
         token = auth_header.split(' ')[1]
+
+        user = auth_cache.user_for_token(token)
+        if user is not None:
+            request.user = user
+            return f(*args, **kwargs)
         
         try:
             correlation_id = generate_correlation_id()
@@ -572,41 +889,142 @@ def requires_auth(f):
                 'X-API-KEY': API_KEY,
                 'X-Correlation-ID': correlation_id
             }
-            response = requests.post(
-                f'{AUTH_SERVICE_URL}/api/validate-token',
-                json={'token': token},
-                headers=headers
-            )
+            with timed('auth'):
+                response = http.post(
+                    f'{AUTH_SERVICE_URL}/api/validate-token',
+                    json={'token': token},
+                    headers=headers,
+                    timeout=UPSTREAM_TIMEOUT
+                )
             
             if response.status_code != 200:
                 api.abort(401, 'Invalid token')
                 
-            request.user = response.json()['user']
+            request.user = auth_cache.remember(token, response.json()['user'])
             return f(*args, **kwargs)
-            
+
+        except HTTPException:
+            raise
         except Exception as e:
-            logging.error(f"Token validation error: {str(e)}")
+            logging.error("Token validation error: %s", str(e))
             api.abort(503, 'Authentication service unavailable')
             
     return decorated
 
+# Requests that matched no route share one bucket, so arbitrary URLs cannot grow the timing tables
+UNMATCHED_ROUTE = '<unmatched>'
+
+def request_route():
+    return request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+
+def client_ip():
+    return client_address(request.remote_addr, request.headers.get('X-Forwarded-For'), TRUSTED_PROXY_HOPS)
+
+def rate_limited(retry_after):
+    return {'message': 'Rate limit exceeded'}, 429, {'Retry-After': str(math.ceil(retry_after))}
+
+def admit_request():
+    route_class = classify(request.method, request.path)
+    retry_after = load_shedder.check(route_class)
+    if retry_after:
+        logging.warning("Shedding %s request: %s %s", route_class, request.method, request.path)
+        return {'message': 'Service overloaded, retry later'}, 503, {'Retry-After': str(retry_after)}
+
+    retry_after = address_rate_limiter.check(client_ip(), route_class)
+    if retry_after:
+        return rate_limited(retry_after)
+
+    pool = pool_for(request.method, request.path)
+    try:
+        queued = scheduler.acquire(pool)
+    except QueueTimeout:
+        logging.warning("Timed out queueing %s request: %s %s", pool, request.method, request.path)
+        return {'message': 'Service overloaded, retry later'}, 503, {'Retry-After': str(math.ceil(scheduler.timeout))}
+    g.scheduler_pool = pool
+    load_shedder.observe(queued)
+
+def admit_user():
+    """Per-user rate limit, keyed on the id of the validated token's user"""
+    retry_after = rate_limiter.check(f"user:{(request.user or {}).get('id')}", classify(request.method, request.path))
+    if retry_after:
+        return rate_limited(retry_after)
+
 @app.before_request
 def before_request():
     # Exempt the /docs endpoint from logging and API key checks
-    if request.path.startswith('/docs') or request.path.startswith('/swagger'):
+    if request.path.startswith('/docs') or request.path.startswith('/swagger') or request.path in HEALTH_ROUTES:
         return
 
-    logging.info("Received request: %s %s", request.method, request.url)
-    logging.debug(f"Headers: {request.headers}")
+    g.timings = {}
+    g.request_started = time.perf_counter()
+    profiler.begin_request(request_route())
+
+    logging.info("Received request: %s %s", request.method, request.path)
 
     if request.method == 'OPTIONS':
         return {'status': 'ok'}, 200
+
+    # Service callbacks and admin calls are authenticated by API key (requires_api_key);
+    # with a valid key they bypass client rate limits and the scheduler pools, so status
+    # pushes are not dropped when uploads are busy
+    if request.path in SERVICE_ROUTES or request.path.startswith(ADMIN_PREFIX):
+        if API_KEY and request.headers.get('X-API-KEY') == API_KEY:
+            return
+
+    rejection = admit_request()
+    if rejection:
+        return rejection
     
     # Skip authentication for exempt routes
-    if request.path in EXEMPT_ROUTES:
+    if request.path in EXEMPT_ROUTES or request.path in SERVICE_ROUTES or request.path.startswith(ADMIN_PREFIX):
         return
         
-    return requires_auth(lambda: None)()
+    return requires_auth(admit_user)()
+
+@app.after_request
+def add_server_timing(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics = [f'{phase};dur={duration * 1000:.1f}' for phase, duration in g.timings.items()]
+        metrics.append(f'total;dur={(time.perf_counter() - started) * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(metrics)
+    return response
+
+@app.teardown_request
+def release_worker_slot(exc=None):
+    pool = g.pop('scheduler_pool', None)
+    if pool is not None:
+        scheduler.release(pool)
+
+    started = g.pop('request_started', None)
+    if started is not None:
+        latency = time.perf_counter() - started
+        profiler.end_request(latency)
+        route_timings.record(request_route(), latency, g.timings)
+
+@app.route('/healthz')
+def healthz():
+    return {'status': 'ok'}, 200
+
+@app.route('/readyz')
+def readyz():
+    report = readiness.report()
+    return report, 200 if report['ready'] else 503
+
+def build_api_schema():
+    with app.test_request_context():
+        return api.__schema__
+
+def prime_caches():
+    for cache in (validator_cache, auth_cache.token_cache, auth_cache.profile_cache):
+        cache.get('warmup')
+    dumps({'warmup': [1, 2.0, None]})
+
+readiness.start([
+    ('api_schema', build_api_schema),
+    ('caches', prime_caches),
+    ('upstream_connections', readiness.open_connections),
+], interval=float(secrets.get('HEALTH_PROBE_INTERVAL', 10)))
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=C_PORT)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import hashlib
+import time
+
+# Caches what the auth service already tells us: which user a token belongs to,
+# and that user's profile. Tokens map to a user id; profiles are stored once per
+# user so a re-login or an auth-service event updates every session at once.
+
+
+def token_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class AuthCache:
+    """
+    Args:
+        token_cache (Cache): Token hash -> {'user_id', 'validated_at'}
+        profile_cache (Cache): User id -> profile, plus per-user revocation marks
+        token_ttl (int): Seconds a validated token is trusted without asking the auth service
+    """
+
+    def __init__(self, token_cache, profile_cache, token_ttl=60):
+        self.token_cache = token_cache
+        self.profile_cache = profile_cache
+        self.token_ttl = token_ttl
+
+    def profile(self, user_id):
+        return self.profile_cache.get(f'user:{user_id}')
+
+    def update_profile(self, user):
+        """
+        Store the latest profile for a user, merged over what is already known
+        """
+        if not user or user.get('id') is None:
+            return user
+        profile = dict(self.profile(user['id']) or {}, **user)
+        self.profile_cache.set(f'user:{user["id"]}', profile)
+        return profile
+
+    def remember(self, token, user):
+        """
+        Record a token the auth service issued or validated, and its user's profile
+        """
+        profile = self.update_profile(user)
+        if profile and profile.get('id') is not None:
+            self.token_cache.set(token_key(token), {'user_id': profile['id'], 'validated_at': time.time()}, self.token_ttl)
+        return profile
+
+    def user_for_token(self, token):
+        """
+        Return the cached profile for a token, or None if it must be validated upstream
+        """
+        entry = self.token_cache.get(token_key(token))
+        if entry is None:
+            return None
+        revoked_at = self.profile_cache.get(f'revoked:{entry["user_id"]}')
+        if revoked_at is not None and entry['validated_at'] <= revoked_at:
+            return None
+        return self.profile(entry['user_id'])
+
+    def forget_token(self, token):
+        self.token_cache.delete(token_key(token))
+
+    def forget_user(self, user_id):
+        """
+        Drop a user's profile and distrust every token validated before now
+        """
+        self.profile_cache.delete(f'user:{user_id}')
+        self.profile_cache.set(f'revoked:{user_id}', time.time(), self.token_ttl)
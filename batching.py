@@ -0,0 +1,99 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Write-behind micro-batching. Writes arriving within a short window are sent
+# upstream as one bulk request and the results handed back to each caller.
+# Backends without a bulk endpoint get the same writes as parallel single calls.
+
+
+class BulkUnsupported(Exception):
+    """Raised by a bulk sender when the backend has no bulk endpoint"""
+
+
+class BulkRejected(Exception):
+    """Raised by a bulk sender when the backend refused the batch as a whole, e.g. over one invalid item"""
+
+
+class MicroBatcher:
+    """
+    Args:
+        name (str): Name used in logs and thread names
+        send_bulk (callable): Sends a list of items, returns one (body, status) per item in order;
+            raises BulkUnsupported if the backend cannot take bulk requests, or BulkRejected
+            to have this batch's items sent one by one so each gets its own result
+        send_one (callable): Sends a single item, returns (body, status)
+        max_items (int): Largest batch sent in one request
+        max_wait (float): Seconds to wait for more items after the first one arrives
+        workers (int): Threads sending batches and fallback single calls
+    """
+
+    def __init__(self, name, send_bulk, send_one, max_items=20, max_wait=0.005, workers=8):
+        self.name = name
+        self.send_bulk = send_bulk
+        self.send_one = send_one
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.bulk_supported = True
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}-batch')
+        threading.Thread(target=self._collect, name=f'{name}-batcher', daemon=True).start()
+
+    def submit(self, item):
+        """
+        Queue a write; the returned Future resolves to (body, status)
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        if len(batch) == 1 or not self.bulk_supported:
+            for item, future in batch:
+                self._executor.submit(self._send_single, item, future)
+            return
+
+        items = [item for item, _ in batch]
+        try:
+            results = self.send_bulk(items)
+            if len(results) != len(batch):
+                raise ValueError(f'{self.name} bulk response has {len(results)} results for {len(batch)} items')
+        except BulkUnsupported:
+            logging.warning("%s backend has no bulk endpoint, falling back to single calls", self.name)
+            self.bulk_supported = False
+            for item, future in batch:
+                self._executor.submit(self._send_single, item, future)
+            return
+        except BulkRejected:
+            for item, future in batch:
+                self._executor.submit(self._send_single, item, future)
+            return
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _send_single(self, item, future):
+        try:
+            future.set_result(self.send_one(item))
+        except Exception as e:
+            future.set_exception(e)
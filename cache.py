@@ -0,0 +1,263 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Cache backends shared by the composer. Every backend stores JSON-serialisable
+# values so entries can move between worker processes unchanged. Backend errors
+# (a Redis outage, a locked SQLite database) are logged and treated as misses.
+
+DEFAULT_TTL = 300
+# Shared-cache reads refresh an entry's LRU position at most this often, so reads rarely take the write lock
+ACCESS_UPDATE_INTERVAL = 30
+SHARED_CACHE_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+
+
+class Cache:
+    """
+    Minimal cache interface implemented by every backend
+
+    Values must be JSON-serialisable. A ttl of None uses the backend default,
+    a ttl of 0 keeps the entry until it is evicted or deleted.
+    """
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
+
+
+def _expiry(ttl, default_ttl):
+    ttl = default_ttl if ttl is None else ttl
+    return time.time() + ttl if ttl else 0
+
+
+class LRUCache(Cache):
+    """
+    In-process LRU cache with per-entry expiry
+
+    Args:
+        maxsize (int): Maximum number of entries kept before evicting the least recently used
+        ttl (int): Default time to live in seconds
+    """
+
+    def __init__(self, maxsize=1024, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, _expiry(ttl, self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedMemoryCache(Cache):
+    """
+    Host-wide cache shared by every worker process on the machine
+
+    Entries live in a SQLite database under /dev/shm (tmpfs), so all workers
+    see the same data without a network hop. Eviction is approximate LRU based
+    on last access time.
+
+    Args:
+        name (str): Cache name, used for the database file name
+        maxsize (int): Maximum number of entries before the oldest are evicted
+        ttl (int): Default time to live in seconds
+        path (str): Explicit database path, overrides the name-based default
+    """
+
+    def __init__(self, name='composer', maxsize=10000, ttl=DEFAULT_TTL, path=None):
+        self.path = path or os.path.join(SHARED_CACHE_DIR, f'gnosis-{name}.cache')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute('SELECT value, expires_at, accessed_at FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return default
+            value, expires_at, accessed_at = row
+            if expires_at and expires_at < now:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return default
+            if now - accessed_at >= ACCESS_UPDATE_INTERVAL:
+                conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logging.warning("Shared cache read failed for %s: %s", self.path, str(e))
+            return default
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), _expiry(ttl, self.ttl), now)
+            )
+            conn.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.maxsize,)
+            )
+        except sqlite3.Error as e:
+            logging.warning("Shared cache write failed for %s: %s", self.path, str(e))
+
+    def delete(self, key):
+        try:
+            self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logging.warning("Shared cache delete failed for %s: %s", self.path, str(e))
+
+    def clear(self):
+        try:
+            self._conn().execute('DELETE FROM cache')
+        except sqlite3.Error as e:
+            logging.warning("Shared cache clear failed for %s: %s", self.path, str(e))
+
+
+class KeyValueCache(Cache):
+    """
+    Cache backed by an out-of-process key-value store such as Redis
+
+    Any client exposing get/set(ex=)/delete/scan_iter works, which lets tests
+    pass a local stand-in instead of a real server.
+
+    Args:
+        client: Key-value client; when omitted a Redis client is built from url
+        url (str): Connection URL used when no client is given
+        prefix (str): Namespace prepended to every key
+        ttl (int): Default time to live in seconds
+    """
+
+    def __init__(self, client=None, url='redis://localhost:6379/0', prefix='composer', ttl=DEFAULT_TTL):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key, default=None):
+        try:
+            value = self.client.get(self._key(key))
+        except Exception as e:
+            logging.warning("Key-value cache read failed for %s: %s", self.prefix, str(e))
+            return default
+        if value is None:
+            return default
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            # Redis only takes whole seconds
+            self.client.set(self._key(key), json.dumps(value), ex=math.ceil(ttl) if ttl else None)
+        except Exception as e:
+            logging.warning("Key-value cache write failed for %s: %s", self.prefix, str(e))
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            logging.warning("Key-value cache delete failed for %s: %s", self.prefix, str(e))
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(f'{self.prefix}:*'):
+                self.client.delete(key)
+        except Exception as e:
+            logging.warning("Key-value cache clear failed for %s: %s", self.prefix, str(e))
+
+
+def create_cache(backend, name, maxsize=1024, ttl=DEFAULT_TTL, url=None, client=None):
+    """
+    Build a cache for the configured backend
+
+    Args:
+        backend (str): One of 'memory', 'shared' or 'redis'
+        name (str): Cache name, keeps caches of different kinds apart
+        maxsize (int): Maximum number of entries (memory and shared backends)
+        ttl (int): Default time to live in seconds
+        url (str): Connection URL for the redis backend
+        client: Pre-built key-value client for the redis backend
+
+    Returns:
+        Cache: The cache instance
+    """
+    if backend == 'memory':
+        return LRUCache(maxsize=maxsize, ttl=ttl)
+    if backend == 'shared':
+        return SharedMemoryCache(name=name, maxsize=maxsize, ttl=ttl)
+    if backend == 'redis':
+        kwargs = {'client': client, 'prefix': f'gnosis-composer:{name}', 'ttl': ttl}
+        if url:
+            kwargs['url'] = url
+        return KeyValueCache(**kwargs)
+    raise ValueError(f'Unknown cache backend: {backend}')
@@ -0,0 +1,137 @@
+import zlib
+
+from flask import request
+
+# Negotiated response compression. Buffered bodies below the size threshold are
+# sent as-is; streamed bodies (see proxy.passthrough) are compressed on the fly
+# unless the upstream already encoded them.
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'application/xml', 'text/')
+
+settings = {
+    'enabled': True,
+    'min_size': 1024,
+    'gzip_level': 6,
+    'brotli_level': 4,
+}
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def _accepted_encodings(header):
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported encoding from an Accept-Encoding header, or None
+    """
+    accepted = _accepted_encodings(accept_encoding or '')
+    candidates = ['br', 'gzip'] if _brotli() else ['gzip']
+    best = None
+    for encoding in candidates:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def _compressor(encoding):
+    if encoding == 'br':
+        compressor = _brotli().Compressor(quality=settings['brotli_level'])
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(settings['gzip_level'], zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def compress(data, encoding):
+    process, finish = _compressor(encoding)
+    return process(data) + finish()
+
+
+def _compress_stream(chunks, encoding):
+    process, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            compressed = process(chunk)
+            if compressed:
+                yield compressed
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _is_compressible(response):
+    if not settings['enabled'] or response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_response(response, accept_encoding):
+    """
+    Compress a Flask response in place when the client accepts it and it is worth it
+    """
+    if not _is_compressible(response):
+        return response
+
+    encoding = choose_encoding(accept_encoding)
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if response.direct_passthrough or response.is_streamed:
+        length = response.content_length
+        if length is not None and length < settings['min_size']:
+            return response
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < settings['min_size']:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    etag = response.headers.get('ETag')
+    if etag and etag.endswith('"'):
+        # A compressed body is a different representation and needs its own validator
+        response.headers['ETag'] = f'{etag[:-1]}-{encoding}"'
+    return response
+
+
+def init_compression(app, enabled=True, min_size=1024, gzip_level=6, brotli_level=4):
+    """
+    Register response compression on a Flask app
+
+    Args:
+        enabled (bool): Turn compression on or off
+        min_size (int): Smallest body in bytes worth compressing
+        gzip_level (int): zlib compression level, 1-9
+        brotli_level (int): Brotli quality, 0-11; used only when the brotli package is installed
+    """
+    settings.update(enabled=enabled, min_size=min_size, gzip_level=gzip_level, brotli_level=brotli_level)
+
+    @app.after_request
+    def apply_compression(response):
+        return compress_response(response, request.headers.get('Accept-Encoding'))
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+# Adaptive concurrency limits per upstream backend (AIMD). Each backend's
+# in-flight limit grows by one per limit's worth of calls while recent latency
+# stays near its long-run average, and is cut multiplicatively when recent
+# latency climbs past the tolerance or calls fail. Comparing averages rather
+# than single calls keeps a backend's cheap and expensive endpoints from
+# reading as congestion. Excess calls queue briefly, then are shed.
+
+HISTORY_SIZE = 300
+OVERLOAD_STATUSES = (429, 503, 504)
+
+
+class Overloaded(Exception):
+    """Raised when a call could not get an in-flight slot for its backend in time"""
+
+
+class AdaptiveLimit:
+    """
+    Args:
+        name (str): Backend name used in logs and reports
+        initial (int): Starting in-flight limit
+        min_limit (int): Floor the limit never drops below
+        max_limit (int): Ceiling, normally the upstream connection pool size
+        tolerance (float): Recent latency over baseline * tolerance counts as congestion
+        backoff (float): Factor the limit is multiplied by on congestion
+        queue_timeout (float): Seconds a call may wait for a slot before Overloaded
+        max_queue (int): Calls allowed to wait; further calls are shed at once
+        history_interval (float): Seconds between history samples
+    """
+
+    def __init__(self, name, initial=10, min_limit=2, max_limit=100, tolerance=2.0, backoff=0.9,
+                 queue_timeout=2.0, max_queue=100, history_interval=1.0):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.history_interval = history_interval
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+        self.baseline = None
+        self.smoothed = None
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._last_decrease = 0.0
+        self._last_sample = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait for an in-flight slot; returns the start time to hand back to release()
+        """
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                if self.queued >= self.max_queue:
+                    self.shed += 1
+                    raise Overloaded(f'{self.name}: {self.queued} calls already queued')
+                deadline = time.monotonic() + self.queue_timeout
+                self.queued += 1
+                try:
+                    while self.in_flight >= int(self.limit):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            if self.in_flight < int(self.limit):
+                                break
+                            self.shed += 1
+                            raise Overloaded(f'{self.name}: no slot within {self.queue_timeout}s')
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, failed=False, latency=None):
+        """
+        Free a slot and adjust the limit from the call's latency and outcome
+
+        Args:
+            started (float): Value returned by acquire()
+            failed (bool): The call failed or the backend reported overload
+            latency (float): Latency to judge the call by; defaults to the time the slot was held
+        """
+        now = time.monotonic()
+        latency = now - started if latency is None else latency
+        with self._cond:
+            self.in_flight -= 1
+            if not failed:
+                self._observe(latency)
+
+            congested = failed or self.smoothed > self.baseline * self.tolerance
+            if congested:
+                # Cut at most once per round trip: calls started before the last cut reflect the old limit
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+                    logging.info("Concurrency limit for %s lowered to %d (latency %.1f ms, failed=%s)",
+                                 self.name, int(self.limit), (self.smoothed or latency) * 1000, failed)
+                    self._record(now)
+            elif self.in_flight + 1 >= int(self.limit) / 2:
+                # Only grow while the limit is actually being used
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            if now - self._last_sample >= self.history_interval:
+                self._record(now)
+            self._cond.notify()
+
+    def _observe(self, latency):
+        # Short- and long-run averages; the slow one lets the baseline follow a backend
+        # that has become slower for good
+        if self.smoothed is None:
+            self.smoothed = self.baseline = latency
+        self.smoothed = 0.8 * self.smoothed + 0.2 * latency
+        self.baseline = 0.99 * self.baseline + 0.01 * latency
+
+    def _record(self, now):
+        self._last_sample = now
+        self.history.append({
+            'time': time.time(),
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'latency_ms': None if self.smoothed is None else round(self.smoothed * 1000, 1),
+        })
+
+    def snapshot(self, history=True):
+        with self._cond:
+            report = {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'shed': self.shed,
+                'baseline_ms': None if self.baseline is None else round(self.baseline * 1000, 1),
+                'latency_ms': None if self.smoothed is None else round(self.smoothed * 1000, 1),
+            }
+            if history:
+                report['history'] = list(self.history)
+            return report
+
+
+class ConcurrencyLimits:
+    """
+    Routes upstream calls through the limit of the backend their URL belongs to
+
+    Args:
+        backends (callable): Returns {name: base_url}; called per call so rotated URLs apply
+        **settings: AdaptiveLimit arguments shared by every backend
+    """
+
+    def __init__(self, backends, **settings):
+        self.backends = backends
+        self.limits = {name: AdaptiveLimit(name, **settings) for name in backends()}
+
+    def limit_for(self, url):
+        for name, base_url in self.backends().items():
+            if base_url and url.startswith(base_url) and name in self.limits:
+                return self.limits[name]
+        return None
+
+    def call(self, url, send, stream=False):
+        """
+        Make an upstream call within its backend's limit
+
+        Args:
+            url (str): Request URL, used to find the backend
+            send (callable): Makes the call and returns the response
+            stream (bool): The body is read later; keep the slot until the response is closed
+
+        Raises:
+            Overloaded: No slot became free within the queue timeout
+        """
+        limit = self.limit_for(url)
+        if limit is None:
+            return send()
+
+        started = limit.acquire()
+        try:
+            response = send()
+        except Exception:
+            limit.release(started, failed=True)
+            raise
+
+        failed = response.status_code in OVERLOAD_STATUSES
+        if not stream:
+            limit.release(started, failed)
+            return response
+
+        # The call is in flight until its body has been relayed, but is judged by time to
+        # headers so a slow client download does not read as backend congestion
+        latency = time.monotonic() - started
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                limit.release(started, failed, latency)
+
+        # Weak so the wrapper does not keep the response alive and delay the finalizer below
+        response_ref = weakref.ref(response)
+        close = type(response).close
+
+        def close_and_release():
+            try:
+                close(response_ref())
+            finally:
+                release()
+
+        response.close = close_and_release
+        # Safety net for a response dropped without being closed
+        weakref.finalize(response, release)
+        return response
+
+    def snapshot(self, history=True):
+        return {name: limit.snapshot(history) for name, limit in self.limits.items()}
@@ -0,0 +1,168 @@
+import hashlib
+import uuid
+
+from flask import Response, request
+from werkzeug.http import parse_date
+
+from profiling import timed
+from proxy import passthrough
+
+# Conditional GET support for relayed reads. Validators (ETag / Last-Modified) are
+# remembered per path and Accept-Encoding, so a matching If-None-Match can be
+# answered with 304 without calling upstream while the entry is fresh. Keys may
+# belong to a scope (e.g. every conversation list); bumping the scope's generation
+# invalidates all of them at once.
+
+# Bodies larger than this are streamed without computing an ETag
+MAX_ETAG_BODY = 4 * 1024 * 1024
+ENCODING_SUFFIXES = ('-gzip', '-br')
+
+
+def compute_etag(body):
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _opaque(etag):
+    etag = etag.strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    etag = etag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)]
+    return etag
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an ETag, ignoring compression suffixes
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return _opaque(etag) in {_opaque(candidate) for candidate in if_none_match.split(',')}
+
+
+def _not_modified_since(if_modified_since, last_modified):
+    if not if_modified_since or not last_modified:
+        return False
+    since, modified = parse_date(if_modified_since), parse_date(last_modified)
+    return since is not None and modified is not None and modified <= since
+
+
+def _is_fresh(validator):
+    if etag_matches(request.headers.get('If-None-Match'), validator.get('etag')):
+        return True
+    if 'If-None-Match' in request.headers:
+        return False
+    return _not_modified_since(request.headers.get('If-Modified-Since'), validator.get('last_modified'))
+
+
+def not_modified(validator):
+    response = Response(status=304)
+    if validator.get('etag'):
+        response.headers['ETag'] = validator['etag']
+    if validator.get('last_modified'):
+        response.headers['Last-Modified'] = validator['last_modified']
+    return response
+
+
+def upstream_validators():
+    """
+    Client validators to pass upstream when the composer cannot answer itself
+    """
+    headers = {}
+    for name in ('If-None-Match', 'If-Modified-Since'):
+        if name in request.headers:
+            headers[name] = request.headers[name]
+    return headers
+
+
+def conditional_body(body, mimetype='application/json'):
+    """
+    Answer from a body the composer already holds: 304 if the client has it, else 200 with an ETag
+    """
+    validator = {'etag': compute_etag(body)}
+    if _is_fresh(validator):
+        return not_modified(validator)
+    return Response(body, status=200, mimetype=mimetype, headers={'ETag': validator['etag']})
+
+
+def conditional_get(cache, key, send, ttl, on_body=None):
+    """
+    Serve a relayed GET with ETag / Last-Modified support
+
+    Args:
+        cache (Cache): Validator cache, entries keyed by resource
+        key (str): Resource key, also used by invalidate()
+        send (callable): Makes the upstream request (stream=True) given extra headers
+        ttl (int): Seconds a validator may answer 304 without asking upstream
+        on_body (callable): Called with the raw body bytes whenever the body is buffered
+
+    Returns:
+        flask.Response: 304, or the upstream response with an ETag attached
+    """
+    variant = request.headers.get('Accept-Encoding', 'identity')
+    entry = cache.get(key) or {}
+    validator = entry.get(variant)
+    if validator and _is_fresh(validator):
+        return not_modified(validator)
+
+    response = send(upstream_validators())
+    if response.status_code == 304:
+        response.close()
+        return not_modified({
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        })
+    if response.status_code != 200:
+        return passthrough(response)
+
+    etag = response.headers.get('ETag')
+    length = response.headers.get('Content-Length')
+    if etag is None and length is not None and int(length) > MAX_ETAG_BODY:
+        return passthrough(response)
+
+    if etag is None:
+        with timed('upstream'):
+            # Chunked bodies have no Content-Length; stop buffering once the limit is passed
+            body = response.raw.read(MAX_ETAG_BODY + 1, decode_content=False)
+        if len(body) > MAX_ETAG_BODY:
+            return passthrough(response, head=body)
+        response.close()
+        if on_body is not None:
+            on_body(body)
+        etag = compute_etag(body)
+        headers = {name: response.headers[name] for name in ('Content-Type', 'Content-Encoding', 'Last-Modified', 'Cache-Control') if name in response.headers}
+        if 'Content-Encoding' in headers:
+            headers['Vary'] = 'Accept-Encoding'
+        client_response = Response(body, status=200, headers=headers)
+    else:
+        client_response = passthrough(response)
+
+    validator = {'etag': etag, 'last_modified': response.headers.get('Last-Modified')}
+    entry[variant] = validator
+    cache.set(key, entry, ttl)
+
+    if _is_fresh(validator):
+        client_response.close()
+        return not_modified(validator)
+    client_response.headers['ETag'] = etag
+    return client_response
+
+
+def invalidate(cache, key):
+    cache.delete(key)
+
+
+def scoped_key(cache, scope, key):
+    """
+    Validator key for a resource in a scope, changing whenever the scope is invalidated
+    """
+    return f"{key}#{cache.get(f'generation:{scope}', '0')}"
+
+
+def invalidate_scope(cache, scope):
+    # A random generation rather than a counter: workers sharing the cache cannot race an increment
+    cache.set(f'generation:{scope}', uuid.uuid4().hex, 0)
@@ -0,0 +1,71 @@
+from flask import Response, request
+
+# CORS preflight fast path. Preflight responses are answered before any other
+# before_request hook runs: no logging, admission, auth or upstream work.
+
+DEFAULT_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+
+def parse_origins(origins):
+    """
+    Normalise the CORS_ORIGINS setting, a list or a comma-separated string, into a list of origins
+    """
+    if isinstance(origins, str):
+        origins = origins.split(',')
+    return [origin.strip() for origin in origins if origin.strip()]
+
+
+class PreflightHandler:
+    """
+    Answers CORS preflight requests from headers precomputed at startup
+
+    Args:
+        origins (list or str): Allowed origins, a comma-separated string of them, or '*' for any origin
+        max_age (int): Seconds browsers may cache the preflight result (Access-Control-Max-Age)
+        methods (tuple): Methods allowed for cross-origin requests
+        supports_credentials (bool): Send Access-Control-Allow-Credentials
+    """
+
+    def __init__(self, origins='*', max_age=7200, methods=DEFAULT_METHODS, supports_credentials=True):
+        origins = parse_origins(origins)
+        self.allow_any = '*' in origins
+        self.base_headers = {
+            'Access-Control-Allow-Methods': ', '.join(methods),
+            'Access-Control-Max-Age': str(max_age),
+            'Vary': 'Origin',
+        }
+        if supports_credentials:
+            self.base_headers['Access-Control-Allow-Credentials'] = 'true'
+        self.origin_headers = {} if self.allow_any else {
+            origin: dict(self.base_headers, **{'Access-Control-Allow-Origin': origin})
+            for origin in origins
+        }
+
+    def _headers_for(self, origin):
+        if not origin:
+            return None
+        if self.allow_any:
+            return dict(self.base_headers, **{'Access-Control-Allow-Origin': origin})
+        headers = self.origin_headers.get(origin)
+        return dict(headers) if headers else None
+
+    def __call__(self):
+        if request.method != 'OPTIONS' or 'Access-Control-Request-Method' not in request.headers:
+            return None
+
+        headers = self._headers_for(request.headers.get('Origin'))
+        if headers is None:
+            return Response(status=403)
+        requested_headers = request.headers.get('Access-Control-Request-Headers')
+        if requested_headers:
+            headers['Access-Control-Allow-Headers'] = requested_headers
+        return Response(status=204, headers=headers)
+
+
+def init_preflight(app, origins='*', max_age=7200, supports_credentials=True):
+    """
+    Install the preflight handler ahead of every other before_request hook
+    """
+    handler = PreflightHandler(origins=origins, max_age=max_age, supports_credentials=supports_credentials)
+    app.before_request_funcs.setdefault(None, []).insert(0, handler)
+    return handler
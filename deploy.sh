@@ -71,6 +71,24 @@ ssh -o StrictHostKeyChecking=no -i "$KEY_PATH" "$EC2_USER@$INSTANCE_PUBLIC_IP" <
         -p $HOST_PORT:$CONTAINER_PORT \
         $ECR_REGISTRY_URI:latest
 
+    # Wait until the new container has warmed up and can reach its backends
+    echo "⏳ Waiting for readiness..."
+    READY=0
+    for i in \$(seq 1 30); do
+        if curl -sf http://localhost:$HOST_PORT/readyz > /dev/null; then
+            READY=1
+            break
+        fi
+        sleep 2
+    done
+    if [ "\$READY" != "1" ]; then
+        echo "❌ Container never became ready:"
+        curl -s http://localhost:$HOST_PORT/readyz || true
+        docker logs --tail 50 \$(docker ps -q --filter ancestor=$ECR_REGISTRY_URI:latest) || true
+        exit 1
+    fi
+    echo "✅ Container is ready"
+
     # Verify the new container is running
     echo "✅ Verifying deployment..."
     docker ps
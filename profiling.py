@@ -0,0 +1,212 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from flask import g, has_request_context
+
+# Low-overhead profiling: per-request phase timings (auth, upstream wait,
+# (de)serialisation) and a sampling profiler producing collapsed stacks per
+# route, the input format of flamegraph.pl and speedscope.
+
+PHASES = ('auth', 'upstream', 'serialization', 'deserialization')
+MAX_STACK_DEPTH = 64
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to the current request's phase timings
+    """
+    if not has_request_context() or 'timings' not in g or g.get('timing_phase'):
+        # Nested phases are booked to the outermost one, e.g. the upstream call made during auth
+        yield
+        return
+    g.timing_phase = phase
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.timings[phase] = g.timings.get(phase, 0.0) + time.perf_counter() - started
+        g.timing_phase = None
+
+
+class TimedSession(requests.Session):
+    """
+    requests.Session that books upstream wait and response decoding into phase timings
+
+    Cookies are never stored: the session is shared by all requests. When limits
+    (a ConcurrencyLimits) is set, every call also goes through its backend's limit
+    unless made with limited=False, as health probes are.
+    """
+
+    def __init__(self, limits=None):
+        super().__init__()
+        self.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.limits = limits
+
+    def request(self, method, url, *args, limited=True, **kwargs):
+        send = lambda: super(TimedSession, self).request(method, url, *args, **kwargs)
+        with timed('upstream'):
+            if self.limits is None or not limited:
+                response = send()
+            else:
+                response = self.limits.call(url, send, stream=kwargs.get('stream', False))
+        decode = response.json
+
+        def json(**json_kwargs):
+            with timed('deserialization'):
+                return decode(**json_kwargs)
+
+        response.json = json
+        return response
+
+
+class RouteTimings:
+    """
+    Aggregated request latency and phase split per route
+    """
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0, 'phases': Counter()})
+        self._lock = threading.Lock()
+
+    def record(self, route, total, phases):
+        with self._lock:
+            stats = self._stats[route]
+            stats['count'] += 1
+            stats['total'] += total
+            stats['max'] = max(stats['max'], total)
+            stats['phases'].update(phases)
+
+    def report(self):
+        with self._lock:
+            return {
+                route: {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total'] / stats['count'] * 1000, 2),
+                    'max_ms': round(stats['max'] * 1000, 2),
+                    'avg_phase_ms': {
+                        phase: round(stats['phases'][phase] / stats['count'] * 1000, 2)
+                        for phase in PHASES
+                    },
+                }
+                for route, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of threads serving requests at a fixed interval
+
+    The sampler thread only runs while a timed session is active or a
+    slow-request threshold is set. With a threshold, samples are kept only
+    for requests that end up slower than it.
+
+    Args:
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.threshold = None
+        self.until = 0.0
+        self._active = {}
+        self._pending = {}
+        self._stacks = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_running(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def start(self, seconds):
+        """
+        Record samples for every request during the next N seconds
+        """
+        self.until = time.monotonic() + seconds
+        self._ensure_running()
+
+    def set_threshold(self, seconds):
+        """
+        Keep samples of requests slower than the threshold; None disables
+        """
+        self.threshold = seconds
+        if seconds is not None:
+            self._ensure_running()
+
+    def begin_request(self, route):
+        self._active[threading.get_ident()] = route
+
+    def end_request(self, latency):
+        thread_id = threading.get_ident()
+        route = self._active.pop(thread_id, None)
+        with self._lock:
+            samples = self._pending.pop(thread_id, None)
+            if samples and route and self.threshold is not None and latency >= self.threshold:
+                self._stacks[route].update(samples)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while time.monotonic() < self.until or self.threshold is not None:
+            sampling_all = time.monotonic() < self.until
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, route in list(self._active.items()):
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own_id:
+                        continue
+                    stack = _collapse(frame)
+                    if sampling_all:
+                        self._stacks[route][stack] += 1
+                    else:
+                        self._pending.setdefault(thread_id, Counter())[stack] += 1
+            time.sleep(self.interval)
+
+    def collapsed(self, route=None):
+        """
+        Return samples as collapsed stack lines ('route;frame;frame count')
+        """
+        with self._lock:
+            lines = []
+            for name, stacks in self._stacks.items():
+                if route is not None and name != route:
+                    continue
+                lines.extend(f'{name};{stack} {count}' for stack, count in stacks.items())
+            return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._pending.clear()
+
+    def status(self):
+        return {
+            'running': self.running,
+            'seconds_remaining': max(0.0, round(self.until - time.monotonic(), 2)),
+            'threshold_ms': None if self.threshold is None else self.threshold * 1000,
+            'routes': sorted(self._stacks),
+        }
@@ -0,0 +1,45 @@
+from flask import Response, request
+
+# Relay helpers for routes that hand upstream responses back unchanged.
+# Bodies are streamed as raw bytes: never decoded, parsed or re-encoded.
+
+FORWARDED_HEADERS = ('Content-Type', 'Content-Encoding', 'Content-Length', 'ETag', 'Last-Modified', 'Cache-Control')
+CHUNK_SIZE = 64 * 1024
+
+
+def relay_request_headers(headers):
+    """
+    Add the client's Accept-Encoding to upstream headers so compressed bodies can be relayed as-is
+
+    Requests must then be made with stream=True and returned through passthrough().
+    """
+    headers['Accept-Encoding'] = request.headers.get('Accept-Encoding', 'identity')
+    return headers
+
+
+def passthrough(response, forward_headers=FORWARDED_HEADERS, head=b''):
+    """
+    Stream an upstream response to the client without decoding it
+
+    Args:
+        response (requests.Response): Upstream response, requested with stream=True
+        forward_headers (tuple): Upstream headers copied onto the client response
+        head (bytes): Body bytes already read from the response, sent first
+
+    Returns:
+        flask.Response: Streaming response with the upstream status, headers and bytes
+    """
+    headers = {name: response.headers[name] for name in forward_headers if name in response.headers}
+    if 'Content-Encoding' in headers:
+        headers['Vary'] = 'Accept-Encoding'
+
+    def generate():
+        try:
+            if head:
+                yield head
+            for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+                yield chunk
+        finally:
+            response.close()
+
+    return Response(generate(), status=response.status_code, headers=headers, direct_passthrough=True)
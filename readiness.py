@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Startup warm-up and readiness. The instance reports ready only after every
+# warm-up task has run and each backend has answered a probe, and it stops
+# reporting ready when a backend fails several probes in a row.
+
+
+class Readiness:
+    """
+    Args:
+        session (requests.Session): Shared upstream session whose pool is warmed
+        backends (callable): Returns {name: base_url}; called on every probe so rotated URLs apply
+        probe_path (str): Path requested on each backend; any non-5xx answer counts as healthy
+        timeout (float): Probe timeout in seconds
+        failure_threshold (int): Consecutive failed probes before a backend counts as down
+        connections (int): Connections opened per backend during warm-up
+        request_options (dict): Extra keyword arguments for every probe request
+    """
+
+    def __init__(self, session, backends, probe_path='/health', timeout=2, failure_threshold=3, connections=4,
+                 request_options=None):
+        self.session = session
+        self.backends = backends
+        self.probe_path = probe_path
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.connections = connections
+        self.request_options = request_options or {}
+        self.warmed = False
+        self.warmup_errors = {}
+        self.backend_status = {}
+        self._lock = threading.Lock()
+
+    def _probe_backend(self, name, url):
+        started = time.monotonic()
+        try:
+            response = self.session.get(f'{url}{self.probe_path}', timeout=self.timeout, **self.request_options)
+            response.close()
+            healthy, error = response.status_code < 500, None
+            if not healthy:
+                error = f'HTTP {response.status_code}'
+        except Exception as e:
+            healthy, error = False, str(e)
+
+        with self._lock:
+            status = self.backend_status.setdefault(name, {'failures': 0})
+            status['failures'] = 0 if healthy else status['failures'] + 1
+            status['checked_at'] = time.time()
+            if healthy:
+                status['last_success'] = status['checked_at']
+            # A backend is up once it has answered, until it fails failure_threshold probes in a row
+            status.update(
+                healthy='last_success' in status and status['failures'] < self.failure_threshold,
+                latency_ms=round((time.monotonic() - started) * 1000, 1),
+                error=error
+            )
+        return healthy
+
+    def probe(self):
+        """
+        Probe every backend once, concurrently
+        """
+        backends = self.backends()
+        with ThreadPoolExecutor(max_workers=len(backends) or 1) as executor:
+            for name, url in backends.items():
+                executor.submit(self._probe_backend, name, url)
+
+    def open_connections(self):
+        """
+        Fill the session's connection pool with live connections to every backend
+        """
+        backends = self.backends()
+        with ThreadPoolExecutor(max_workers=max(1, len(backends) * self.connections)) as executor:
+            for name, url in backends.items():
+                for _ in range(self.connections):
+                    executor.submit(self._probe_backend, name, url)
+
+    def warm_up(self, tasks):
+        """
+        Run warm-up tasks, then mark the instance warmed
+
+        Args:
+            tasks (list): (name, callable) pairs; failures are recorded but do not block readiness
+        """
+        for name, task in tasks:
+            started = time.monotonic()
+            try:
+                task()
+                logging.info("Warm-up task %s finished in %.1f ms", name, (time.monotonic() - started) * 1000)
+            except Exception as e:
+                logging.error("Warm-up task %s failed: %s", name, str(e))
+                self.warmup_errors[name] = str(e)
+        self.warmed = True
+
+    def start(self, tasks, interval=10):
+        """
+        Warm up in the background, then keep probing backends every interval seconds
+        """
+        def run():
+            self.warm_up(tasks)
+            while True:
+                time.sleep(interval)
+                self.probe()
+
+        thread = threading.Thread(target=run, name='readiness', daemon=True)
+        thread.start()
+        return thread
+
+    def _is_ready(self):
+        backends_up = all(status['healthy'] for status in self.backend_status.values())
+        return self.warmed and bool(self.backend_status) and backends_up
+
+    @property
+    def ready(self):
+        with self._lock:
+            return self._is_ready()
+
+    def report(self):
+        with self._lock:
+            return {
+                'ready': self._is_ready(),
+                'warmed': self.warmed,
+                'warmup_errors': dict(self.warmup_errors),
+                'backends': {name: dict(status) for name, status in self.backend_status.items()},
+            }
@@ -0,0 +1,257 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+from flask import request
+from flask_restx import Resource
+from werkzeug.exceptions import HTTPException
+
+from concurrency import Overloaded
+from conditional import conditional_get, invalidate, invalidate_scope, scoped_key
+from proxy import passthrough, relay_request_headers
+
+# Declarative proxy routes. Each Route describes one endpoint (path, method,
+# backend, timeout, cacheability, idempotency, streaming); a RouteTable compiles
+# them into flask-restx resources that share the upstream session, validator
+# cache, retries, error handling and per-route metrics.
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def upstream_path(path):
+    """
+    Default upstream path for a namespace route: '/convos/<int:id>' -> '/api/convos/{id}'
+    """
+    return '/api' + re.sub(r'<(?:[^:>]+:)?([^>]+)>', r'{\1}', path)
+
+
+class Route:
+    """
+    Args:
+        path (str): Route under the namespace, with Flask converters, e.g. '/convos/<int:conversation_id>'
+        method (str): HTTP method
+        backend (str): Backend name, resolved to a base URL on every call
+        upstream (str): Upstream path template formatted with the view args; defaults to /api + path
+        timeout (float): Upstream timeout in seconds
+        cache_ttl (float): Seconds validators may answer conditional GETs; None if not cacheable
+        idempotent (bool): Whether connection failures are retried; defaults from the method
+        streaming (bool): Relay the upstream body as raw bytes instead of decoding it
+        prepare (callable): view args -> requests kwargs (json, params, files, data, headers); may abort
+        send (callable): (kwargs, headers, timeout, **view args) -> (body, status), replacing the direct
+            upstream call; it must apply the timeout itself and is never retried
+        respond (callable): (body, status, kwargs, **view args) -> response, for buffered routes
+        local (callable): view args -> response served without calling upstream, or None
+        on_body (callable): (body, **view args), called with buffered bodies of cacheable routes
+        cache_scope (str): Scope the route's validators belong to, e.g. every conversation list
+        invalidates (str): Validator cache key template dropped after the call
+        invalidates_scope (str): Scope whose validators are all dropped after the call
+        unavailable (str): Error message when the backend cannot be reached
+        doc (dict): Swagger documentation: name, summary, expect, marshal, responses
+    """
+
+    def __init__(self, path, method, backend, upstream=None, timeout=30, cache_ttl=None, idempotent=None,
+                 streaming=False, prepare=None, send=None, respond=None, local=None, on_body=None,
+                 invalidates=None, unavailable=None, doc=None, cache_scope=None, invalidates_scope=None):
+        self.path = path
+        self.method = method.upper()
+        self.backend = backend
+        self.upstream = upstream or upstream_path(path)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.idempotent = self.method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        self.streaming = streaming
+        self.prepare = prepare
+        self.send = send
+        self.respond = respond
+        self.local = local
+        self.on_body = on_body
+        self.invalidates = invalidates
+        self.cache_scope = cache_scope
+        self.invalidates_scope = invalidates_scope
+        self.unavailable = unavailable or f'{backend.capitalize()} service unavailable'
+        self.doc = doc or {}
+
+    @property
+    def key(self):
+        return f'{self.method} {self.path}'
+
+    def describe(self):
+        return {
+            'path': self.path,
+            'method': self.method,
+            'backend': self.backend,
+            'upstream': self.upstream,
+            'timeout': self.timeout,
+            'cache_ttl': self.cache_ttl,
+            'idempotent': self.idempotent,
+            'streaming': self.streaming,
+        }
+
+
+class RouteTable:
+    """
+    Args:
+        api (flask_restx.Api): API used for Swagger documentation and errors
+        namespace (flask_restx.Namespace): Namespace the compiled resources are added to
+        session (requests.Session): Shared upstream session
+        backends (callable): Returns {name: base_url}; called per request so rotated URLs apply
+        headers (callable): Returns the base upstream headers for the current request
+        cache (Cache): Validator cache for cacheable routes
+        retries (int): Extra attempts for idempotent routes after a connection failure or timeout
+        retry_backoff (float): Seconds before the first retry, doubled on each further one
+    """
+
+    def __init__(self, api, namespace, session, backends, headers, cache, retries=2, retry_backoff=0.05):
+        self.api = api
+        self.namespace = namespace
+        self.session = session
+        self.backends = backends
+        self.headers = headers
+        self.cache = cache
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.routes = []
+        self._stats = defaultdict(lambda: {'calls': 0, 'retries': 0, 'failures': 0, 'shed': 0, 'statuses': Counter()})
+        self._lock = threading.Lock()
+
+    def compile(self, routes):
+        """
+        Register routes, one resource per path with a handler per method
+        """
+        by_path = defaultdict(list)
+        for route in routes:
+            by_path[route.path].append(route)
+            self.routes.append(route)
+
+        for path, path_routes in by_path.items():
+            methods = {route.method.lower(): self._view(route) for route in path_routes}
+            name = ''.join(part.capitalize() for part in re.findall(r'[a-z0-9]+', re.sub(r'<[^:>]+:', '<', path)))
+            self.namespace.add_resource(type(f'{name}Resource', (Resource,), methods), path)
+
+    def _view(self, route):
+        def view(resource, **view_args):
+            return self.handle(route, view_args)
+
+        view.__name__ = route.method.lower()
+        view.__doc__ = route.doc.get('summary')
+        if route.doc.get('marshal') is not None:
+            view = self.api.marshal_with(route.doc['marshal'])(view)
+        for code, description in route.doc.get('responses', {}).items():
+            view = self.api.response(code, description)(view)
+        if route.doc.get('expect') is not None:
+            view = self.api.expect(route.doc['expect'])(view)
+        if route.doc.get('name'):
+            view = self.api.doc(route.doc['name'])(view)
+        return view
+
+    def _count(self, route, field, status=None):
+        with self._lock:
+            stats = self._stats[route.key]
+            if status is not None:
+                stats['statuses'][status] += 1
+            else:
+                stats[field] += 1
+
+    def _request(self, route, url, headers, **kwargs):
+        attempts = 1 + (self.retries if route.idempotent else 0)
+        for attempt in range(attempts):
+            try:
+                return self.session.request(route.method, url, headers=headers, timeout=route.timeout, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt + 1 == attempts:
+                    raise
+                logging.warning("Retrying %s %s after: %s", route.method, url, str(e))
+                self._count(route, 'retries')
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _decode(self, response):
+        # Empty bodies (e.g. 204 after a delete) and non-JSON successes are relayed, not treated as failures
+        if not response.content:
+            return {}
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    def _default_kwargs(self, route):
+        if route.method in ('GET', 'HEAD', 'DELETE'):
+            return {'params': request.args.to_dict(flat=False)} if request.args else {}
+        return {'json': request.get_json(silent=True)}
+
+    def handle(self, route, view_args):
+        if route.local is not None:
+            response = route.local(**view_args)
+            if response is not None:
+                return response
+
+        kwargs = route.prepare(**view_args) if route.prepare else self._default_kwargs(route)
+        headers = dict(self.headers(), **kwargs.pop('headers', {}))
+        url = self.backends()[route.backend] + route.upstream.format(**view_args)
+        self._count(route, 'calls')
+        logging.info("Proxying %s %s to %s, Correlation ID: %s", route.method, request.path, url, headers.get('X-Correlation-ID'))
+
+        try:
+            if route.streaming:
+                return self._relay(route, url, headers, kwargs, view_args)
+            if route.send is not None:
+                body, status = route.send(kwargs, headers, route.timeout, **view_args)
+            else:
+                response = self._request(route, url, headers, **kwargs)
+                body, status = self._decode(response), response.status_code
+            self._count(route, None, status)
+            if route.respond is not None:
+                return route.respond(body, status, kwargs, **view_args)
+            return body, status
+        except HTTPException:
+            raise
+        except Overloaded as e:
+            logging.warning("Shedding %s %s: %s", route.method, request.path, str(e))
+            self._count(route, 'shed')
+            return {'message': route.unavailable}, 503, {'Retry-After': '1'}
+        except Exception as e:
+            logging.error("%s %s failed: %s", route.method, request.path, str(e))
+            self._count(route, 'failures')
+            self.api.abort(503, route.unavailable)
+        finally:
+            if route.invalidates:
+                invalidate(self.cache, route.invalidates.format(**view_args))
+            if route.invalidates_scope:
+                invalidate_scope(self.cache, route.invalidates_scope)
+
+    def _relay(self, route, url, headers, kwargs, view_args):
+        if 'Accept-Encoding' not in headers:
+            relay_request_headers(headers)
+
+        def send(validators):
+            return self._request(route, url, dict(headers, **validators), stream=True, **kwargs)
+
+        if route.cache_ttl is None:
+            response = passthrough(send({}))
+        else:
+            key = request.full_path if request.query_string else request.path
+            if route.cache_scope:
+                key = scoped_key(self.cache, route.cache_scope, key)
+            on_body = route.on_body and (lambda body: route.on_body(body, **view_args))
+            response = conditional_get(self.cache, key, send, route.cache_ttl, on_body=on_body)
+            # Bodies recorded by on_body are served in their local form so the ETag stays stable
+            if route.local is not None and response.status_code == 200:
+                local = route.local(**view_args)
+                if local is not None:
+                    response.close()
+                    response = local
+        self._count(route, None, response.status_code)
+        return response
+
+    def report(self):
+        with self._lock:
+            return [
+                dict(route.describe(), **{
+                    name: {str(code): count for code, count in value.items()} if isinstance(value, Counter) else value
+                    for name, value in self._stats[route.key].items()
+                })
+                for route in self.routes
+            ]
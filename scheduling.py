@@ -0,0 +1,99 @@
+import threading
+import time
+
+from admission import classify
+
+# Priority scheduling of request handling. Worker slots are split between pools
+# by share; each pool is guaranteed its share, and idle slots are lent out only
+# when no higher-priority pool still needs its reservation.
+
+# Pools in priority order
+POOLS = ('interactive', 'write', 'bulk')
+POOL_FOR_CLASS = {
+    'auth': 'interactive',
+    'read': 'interactive',
+    'write': 'write',
+    'bulk': 'bulk',
+}
+DEFAULT_SHARES = {'interactive': 0.6, 'write': 0.25, 'bulk': 0.15}
+
+
+def pool_for(method, path):
+    return POOL_FOR_CLASS[classify(method, path)]
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+class PriorityScheduler:
+    """
+    Admits requests into worker slots by pool priority
+
+    Args:
+        slots (int): Total concurrent requests handled
+        shares (dict): Fraction of slots reserved for each pool
+        timeout (float): Seconds a request may wait for a slot before QueueTimeout
+    """
+
+    def __init__(self, slots=32, shares=None, timeout=10.0):
+        shares = shares or DEFAULT_SHARES
+        self.slots = slots
+        self.timeout = timeout
+        self.reserved = {pool: max(1, int(slots * shares.get(pool, 0))) for pool in POOLS}
+        self.in_use = {pool: 0 for pool in POOLS}
+        self.waiting = {pool: 0 for pool in POOLS}
+        self._cond = threading.Condition()
+
+    def _can_run(self, pool):
+        free = self.slots - sum(self.in_use.values())
+        if free <= 0:
+            return False
+        higher = POOLS[:POOLS.index(pool)]
+        if any(self.waiting[other] for other in higher):
+            # Higher-priority work is queued; only take our own reservation
+            return self.in_use[pool] < self.reserved[pool]
+        if self.in_use[pool] < self.reserved[pool]:
+            return True
+        # Borrow an idle slot, keeping higher-priority reservations available
+        held_back = sum(max(0, self.reserved[other] - self.in_use[other]) for other in higher)
+        return free - 1 >= held_back
+
+    def acquire(self, pool):
+        """
+        Wait for a slot in the given pool
+
+        Returns:
+            float: Seconds spent queued
+
+        Raises:
+            QueueTimeout: No slot became available in time
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            self.waiting[pool] += 1
+            try:
+                while not self._can_run(pool):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Lower-priority waiters may have been held back by this request
+                        self._cond.notify_all()
+                        raise QueueTimeout(pool)
+                    self._cond.wait(remaining)
+                self.in_use[pool] += 1
+            finally:
+                self.waiting[pool] -= 1
+        return time.monotonic() - started
+
+    def release(self, pool):
+        with self._cond:
+            self.in_use[pool] -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                pool: {'reserved': self.reserved[pool], 'in_use': self.in_use[pool], 'waiting': self.waiting[pool]}
+                for pool in POOLS
+            }
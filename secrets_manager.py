@@ -1,23 +1,171 @@
-import boto3
 import json
+import logging
 import os
-from botocore.exceptions import ClientError
+import threading
+import time
+
+SECRET_NAME = os.environ.get('SECRETS_NAME', 'gnosis-secrets')
+REGION_NAME = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Local snapshot of the last secrets fetched from AWS, used for fast startup and
+# as a fallback when Secrets Manager is unreachable. It lives outside the app tree
+# so it cannot end up in a Docker build context, and holds only the sections named
+# in SECRETS_SNAPSHOT_SERVICES. Set SECRETS_SNAPSHOT_KEY to a Fernet key to keep
+# it encrypted at rest.
+SNAPSHOT_PATH = os.environ.get(
+    'SECRETS_SNAPSHOT_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'gnosis-composer', 'secrets_snapshot.json')
+)
+SNAPSHOT_SERVICES = os.environ.get('SECRETS_SNAPSHOT_SERVICES', 'gnosis-composer').split(',')
+SNAPSHOT_KEY = os.environ.get('SECRETS_SNAPSHOT_KEY')
+CACHE_TTL = int(os.environ.get('SECRETS_CACHE_TTL', 300))
+
+_cache = {'secrets': None, 'fetched_at': 0}
+_lock = threading.Lock()
+_refreshing = threading.Event()
+_listeners = []
+
+
+def get_secrets(secret_name=SECRET_NAME, region_name=REGION_NAME):
+    # boto3 is imported lazily: it is slow to import and not needed when a snapshot is present
+    import boto3
 
-def get_secrets(secret_name="gnosis-secrets", region_name="us-east-1"):        
     session = boto3.session.Session()
     client = session.client(
         service_name='secretsmanager',
         region_name=region_name
     )
+    get_secret_value_response = client.get_secret_value(
+        SecretId=secret_name
+    )
+    return json.loads(get_secret_value_response['SecretString'])
+
+
+def _fernet():
+    from cryptography.fernet import Fernet
+    return Fernet(SNAPSHOT_KEY.encode())
+
 
+def load_snapshot(path=None):
+    path = path or SNAPSHOT_PATH
     try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-        return json.loads(get_secret_value_response['SecretString'])
-    except ClientError as e:
-        raise e
+        with open(path, 'rb') as f:
+            data = f.read()
+        if SNAPSHOT_KEY:
+            data = _fernet().decrypt(data)
+        return json.loads(data), os.path.getmtime(path)
+    except FileNotFoundError:
+        return None, 0
+    except Exception as e:
+        logging.warning("Ignoring unreadable secrets snapshot %s: %s", path, str(e))
+        return None, 0
+
+
+def save_snapshot(secrets, path=None):
+    path = path or SNAPSHOT_PATH
+    # Other services' keys are never written to disk
+    secrets = {name: section for name, section in secrets.items() if name in SNAPSHOT_SERVICES}
+    data = json.dumps(secrets).encode()
+    if SNAPSHOT_KEY:
+        data = _fernet().encrypt(data)
+    tmp_path = f'{path}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning("Could not write secrets snapshot %s: %s", path, str(e))
+
+
+def add_refresh_listener(callback):
+    """
+    Register a callback invoked with the full secrets dict whenever a refresh changes it
+    """
+    _listeners.append(callback)
+
+
+def refresh_secrets():
+    """
+    Fetch secrets from AWS and update the cache and snapshot
+
+    Returns:
+        bool: True if the refresh succeeded
+    """
+    try:
+        secrets = get_secrets()
+    except Exception as e:
+        logging.warning("Secrets refresh failed, keeping cached values: %s", str(e))
+        return False
+
+    with _lock:
+        changed = secrets != _cache['secrets']
+        _cache['secrets'] = secrets
+        _cache['fetched_at'] = time.time()
+
+    if changed:
+        save_snapshot(secrets)
+        for callback in _listeners:
+            try:
+                callback(secrets)
+            except Exception as e:
+                logging.error("Secrets refresh listener failed: %s", str(e))
+    return True
+
+
+def _refresh_in_background():
+    if _refreshing.is_set():
+        return
+    _refreshing.set()
+
+    def run():
+        try:
+            refresh_secrets()
+        finally:
+            _refreshing.clear()
+
+    threading.Thread(target=run, name='secrets-refresh', daemon=True).start()
+
+
+def get_all_secrets():
+    """
+    Return all secrets, served from memory, then the local snapshot, then AWS
+
+    Stale values are returned immediately while a refresh runs in the background.
+    AWS is only called synchronously when nothing is cached and no snapshot exists.
+    """
+    with _lock:
+        if _cache['secrets'] is None:
+            snapshot, mtime = load_snapshot()
+            if snapshot is not None:
+                _cache['secrets'] = snapshot
+                _cache['fetched_at'] = mtime
+        secrets = _cache['secrets']
+        stale = time.time() - _cache['fetched_at'] > CACHE_TTL
+
+    if secrets is None:
+        if not refresh_secrets():
+            raise RuntimeError('Secrets unavailable: AWS unreachable and no local snapshot')
+        return _cache['secrets']
+
+    if stale:
+        _refresh_in_background()
+    return secrets
+
 
 def get_service_secrets(service_name):
-    secrets = get_secrets()
-    return secrets.get(service_name, {})
\ No newline at end of file
+    return get_all_secrets().get(service_name, {})
+
+
+def start_background_refresh(interval=CACHE_TTL):
+    """
+    Periodically refresh secrets so rotated config is picked up without a restart
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            refresh_secrets()
+
+    thread = threading.Thread(target=run, name='secrets-refresher', daemon=True)
+    thread.start()
+    return thread
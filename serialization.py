@@ -0,0 +1,95 @@
+import json
+
+from flask import make_response
+from flask.json.provider import DefaultJSONProvider
+
+from profiling import timed
+
+# Pluggable JSON encoding for the Flask and flask-restx output layers.
+# 'auto' picks orjson when it is installed and falls back to the standard library.
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+
+_backend = {'name': 'json'}
+
+
+def _orjson_dumps(data):
+    import orjson
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _json_dumps(data):
+    return json.dumps(data, default=str, separators=(',', ':')).encode()
+
+
+def set_json_backend(name='auto'):
+    """
+    Select the JSON encoder used for responses
+
+    Args:
+        name (str): One of 'auto', 'orjson' or 'json'
+
+    Returns:
+        str: The backend actually in use
+    """
+    if name not in JSON_BACKENDS:
+        raise ValueError(f'Unknown JSON backend: {name}')
+    if name in ('auto', 'orjson'):
+        try:
+            import orjson  # noqa: F401
+            name = 'orjson'
+        except ImportError:
+            if name == 'orjson':
+                raise
+            name = 'json'
+    _backend['name'] = name
+    return name
+
+
+def dumps(data):
+    """
+    Encode data as compact JSON bytes with the selected backend
+    """
+    if _backend['name'] == 'orjson':
+        return _orjson_dumps(data)
+    return _json_dumps(data)
+
+
+def output_json(data, code, headers=None):
+    """
+    flask-restx representation for application/json built on dumps()
+    """
+    with timed('serialization'):
+        body = dumps(data)
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider so jsonify() and error handlers use the same encoder
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def init_json(app, api, backend='auto'):
+    """
+    Install the fast encoder on a Flask app and its flask-restx Api
+
+    Returns:
+        str: The backend actually in use
+    """
+    name = set_json_backend(backend)
+    app.json = FastJSONProvider(app)
+    api.representations['application/json'] = output_json
+    return name
@@ -0,0 +1,170 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+
+# Queue-backed structured logging. Request threads only filter and enqueue
+# records; formatting and I/O happen on a single listener thread.
+
+settings = {
+    'level': 'INFO',
+    'default_sample_rate': 1.0,
+    'sample_rates': {},
+    'body_limit': 512,
+}
+stats = {'dropped': 0}
+
+_listener = None
+
+
+class BodyPreview:
+    """
+    Lazily rendered, size-limited view of a request or response body
+
+    Nothing is decoded or formatted unless the record is actually emitted.
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    def __str__(self):
+        limit = settings['body_limit']
+        body = self.body
+        if hasattr(body, 'content'):
+            body = body.content
+        if isinstance(body, bytes):
+            truncated = len(body) > limit
+            body = body[:limit].decode('utf-8', 'replace')
+        else:
+            if not isinstance(body, str):
+                body = json.dumps(body, default=str)
+            truncated = len(body) > limit
+            body = body[:limit]
+        return f'{body}... [truncated]' if truncated else body
+
+
+def log_body(body):
+    return BodyPreview(body)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Tag records with the current route and drop them according to its sample rate
+
+    Warnings and errors are never sampled out.
+    """
+
+    def filter(self, record):
+        from flask import has_request_context, request, g
+
+        if has_request_context():
+            record.route = request.url_rule.rule if request.url_rule else request.path
+            record.method = request.method
+            record.correlation_id = g.get('correlation_id')
+
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = settings['sample_rates'].get(getattr(record, 'route', None), settings['default_sample_rate'])
+        return rate >= 1 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers formatting to the listener and drops records when the queue is full
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            stats['dropped'] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    FIELDS = ('route', 'method', 'correlation_id')
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)),
+            'level': record.levelname,
+            'msg': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure_logging(level='INFO', default_sample_rate=1.0, sample_rates=None, body_limit=512, queue_size=10000,
+                      app=None):
+    """
+    Route all logging through a bounded queue drained by a background listener
+
+    Args:
+        level (str): Root log level
+        default_sample_rate (float): Fraction of sub-warning records kept for routes without an explicit rate
+        sample_rates (dict): Per-route sample rates keyed by route rule, e.g. {'/api/convos': 0.1}
+        body_limit (int): Maximum number of characters of a body written to the log
+        queue_size (int): Records buffered before new ones are dropped
+        app (flask.Flask): App whose logger should drop Flask's own stderr handler and log through the queue
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    if app is not None:
+        # Flask's default handler writes synchronously in its own format; app.logger records
+        # propagate to the root logger, so without this every one would be written twice
+        from flask.logging import default_handler
+        app.logger.removeHandler(default_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+    update_logging(
+        level=level,
+        default_sample_rate=default_sample_rate,
+        sample_rates=sample_rates or {},
+        body_limit=body_limit
+    )
+
+
+def update_logging(**changes):
+    """
+    Change logging settings at runtime; unknown keys raise ValueError
+    """
+    unknown = set(changes) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown logging settings: {', '.join(sorted(unknown))}")
+
+    if 'level' in changes:
+        changes['level'] = str(changes['level']).upper()
+        logging.getLogger().setLevel(changes['level'])
+    if 'default_sample_rate' in changes:
+        changes['default_sample_rate'] = float(changes['default_sample_rate'])
+    if 'sample_rates' in changes:
+        changes['sample_rates'] = {route: float(rate) for route, rate in changes['sample_rates'].items()}
+    if 'body_limit' in changes:
+        changes['body_limit'] = int(changes['body_limit'])
+    settings.update(changes)
+    return dict(settings, dropped=stats['dropped'])
@@ -0,0 +1,47 @@
+import unittest
+
+from admission import LoadShedder, RateLimiter, TokenBucket, classify, client_address
+
+
+class TestAdmission(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(classify('POST', '/api/login'), 'auth')
+        self.assertEqual(classify('POST', '/api/composer/batch-convos'), 'bulk')
+        self.assertEqual(classify('GET', '/api/convos/1'), 'read')
+        self.assertEqual(classify('GET', '/api/upload_status/abc'), 'read')
+        self.assertEqual(classify('PUT', '/api/convos/1/reply'), 'write')
+
+    def test_token_bucket_allows_burst_then_throttles(self):
+        bucket = TokenBucket(rate=1, burst=2)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertGreater(bucket.take(), 0)
+
+    def test_rate_limits_are_per_client(self):
+        limiter = RateLimiter(client_limits={'bulk': {'rate': 0.01, 'burst': 1}})
+        self.assertEqual(limiter.check('a', 'bulk'), 0)
+        self.assertGreater(limiter.check('a', 'bulk'), 0)
+        self.assertEqual(limiter.check('b', 'bulk'), 0)
+        self.assertEqual(limiter.check('a', 'read'), 0)
+
+    def test_global_limits_apply_across_clients(self):
+        limiter = RateLimiter(client_limits={}, global_limits={'bulk': {'rate': 0.01, 'burst': 1}})
+        self.assertEqual(limiter.check('a', 'bulk'), 0)
+        self.assertGreater(limiter.check('b', 'bulk'), 0)
+
+    def test_client_address_ignores_client_supplied_hops(self):
+        self.assertEqual(client_address('10.0.0.1', 'spoofed, 1.2.3.4', trusted_hops=0), '10.0.0.1')
+        self.assertEqual(client_address('10.0.0.1', 'spoofed, 1.2.3.4', trusted_hops=1), '1.2.3.4')
+        self.assertEqual(client_address('10.0.0.1', 'spoofed, 1.2.3.4, 10.0.0.9', trusted_hops=2), '1.2.3.4')
+        self.assertEqual(client_address('10.0.0.1', None, trusted_hops=1), '10.0.0.1')
+
+    def test_sheds_bulk_before_reads(self):
+        shedder = LoadShedder(target=0.1)
+        for _ in range(20):
+            shedder.observe(0.3)
+        self.assertGreater(shedder.check('bulk'), 0)
+        self.assertEqual(shedder.check('read'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
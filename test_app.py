@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+# app reads its settings from the secrets snapshot at import time
+SNAPSHOT_DIR = tempfile.mkdtemp()
+SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, 'secrets_snapshot.json')
+with open(SNAPSHOT_PATH, 'w') as f:
+    json.dump({'gnosis-composer': {
+        'API_KEY': 'k',
+        'SECRETS_REFRESH_INTERVAL': 0,
+        'HEALTH_PROBE_INTERVAL': 3600,
+        'RATE_LIMITS': {name: {'rate': 100, 'burst': 100} for name in ('read', 'auth', 'write', 'bulk')},
+        'AUTH_SERVICE_URL': 'http://auth.invalid',
+        'CONVERSATION_SERVICE_URL': 'http://conversation.invalid',
+        'UPLOAD_SERVICE_URL': 'http://upload.invalid',
+    }}, f)
+os.environ['SECRETS_SNAPSHOT_PATH'] = SNAPSHOT_PATH
+
+import app  # noqa: E402
+from batching import BulkRejected  # noqa: E402
+from concurrency import Overloaded  # noqa: E402
+
+
+class TestRequestHooks(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def test_unmatched_paths_share_one_timing_bucket(self):
+        for i in range(3):
+            self.assertEqual(self.client.get(f'/random/{i}').status_code, 401)
+        routes = set(app.route_timings.report())
+        self.assertIn(app.UNMATCHED_ROUTE, routes)
+        self.assertFalse(any(route.startswith('/random') for route in routes))
+
+    def test_rejected_token_is_unauthorized(self):
+        with mock.patch.object(app.http, 'post', lambda *args, **kwargs: FakeResponse(401, {'error': 'expired'})):
+            response = self.client.get('/api/convos', headers={'Authorization': 'Bearer expired'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['message'], 'Invalid token')
+
+    def test_unreachable_auth_service_is_unavailable(self):
+        def post(*args, **kwargs):
+            raise requests.exceptions.ConnectionError('refused')
+
+        with mock.patch.object(app.http, 'post', post):
+            response = self.client.get('/api/convos', headers={'Authorization': 'Bearer unknown'})
+        self.assertEqual(response.status_code, 503)
+
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'HTTP {self.status_code}')
+
+
+class TestSendBulk(unittest.TestCase):
+    def send(self, response):
+        with mock.patch.object(app.http, 'post', lambda *args, **kwargs: response):
+            return app.send_bulk('/api/convos/bulk', {'items': [{}, {}]})
+
+    def test_results_in_order(self):
+        response = FakeResponse(200, {'results': [{'status': 201, 'body': {'id': 1}}, {'status': 400, 'body': {}}]})
+        self.assertEqual(self.send(response), [({'id': 1}, 201), ({}, 400)])
+
+    def test_validation_rejections_are_resent_singly(self):
+        for status in (400, 422):
+            with self.assertRaises(BulkRejected):
+                self.send(FakeResponse(status))
+
+    def test_throttling_fails_the_batch(self):
+        for status in (429, 503):
+            with self.assertRaises(Overloaded):
+                self.send(FakeResponse(status))
+
+if __name__ == '__main__':
+    unittest.main()
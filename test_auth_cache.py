@@ -0,0 +1,39 @@
+import time
+import unittest
+
+from auth_cache import AuthCache
+from cache import LRUCache
+
+
+class TestAuthCache(unittest.TestCase):
+    def setUp(self):
+        self.auth_cache = AuthCache(LRUCache(), LRUCache())
+
+    def test_token_resolves_to_shared_profile(self):
+        self.auth_cache.remember('t1', {'id': 1, 'username': 'ada'})
+        self.auth_cache.remember('t2', {'id': 1, 'email': 'ada@example.com'})
+        self.assertEqual(
+            self.auth_cache.user_for_token('t1'),
+            {'id': 1, 'username': 'ada', 'email': 'ada@example.com'}
+        )
+
+    def test_unknown_token(self):
+        self.assertIsNone(self.auth_cache.user_for_token('missing'))
+
+    def test_forget_user_distrusts_existing_tokens(self):
+        self.auth_cache.remember('t1', {'id': 1})
+        self.auth_cache.forget_user(1)
+        self.assertIsNone(self.auth_cache.user_for_token('t1'))
+        time.sleep(0.001)
+        self.auth_cache.remember('t2', {'id': 1})
+        self.assertIsNone(self.auth_cache.user_for_token('t1'))
+        self.assertEqual(self.auth_cache.user_for_token('t2'), {'id': 1})
+
+    def test_forget_token(self):
+        self.auth_cache.remember('t1', {'id': 1})
+        self.auth_cache.forget_token('t1')
+        self.assertIsNone(self.auth_cache.user_for_token('t1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
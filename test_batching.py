@@ -0,0 +1,70 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import BulkRejected, BulkUnsupported, MicroBatcher
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.bulk_calls = []
+        self.single_calls = []
+
+    def send_bulk(self, items):
+        self.bulk_calls.append(items)
+        return [({'item': item}, 201) for item in items]
+
+    def send_one(self, item):
+        self.single_calls.append(item)
+        return {'item': item}, 200
+
+    def submit_all(self, batcher, items):
+        with ThreadPoolExecutor(len(items)) as executor:
+            return list(executor.map(lambda item: batcher.submit(item).result(timeout=2), items))
+
+    def test_concurrent_writes_share_a_bulk_request(self):
+        batcher = MicroBatcher('test', self.send_bulk, self.send_one, max_items=10, max_wait=0.1)
+        results = self.submit_all(batcher, list(range(5)))
+        self.assertEqual(results, [({'item': i}, 201) for i in range(5)])
+        self.assertEqual(len(self.bulk_calls), 1)
+        self.assertEqual(self.single_calls, [])
+
+    def test_batches_are_capped(self):
+        batcher = MicroBatcher('test', self.send_bulk, self.send_one, max_items=2, max_wait=0.1)
+        self.submit_all(batcher, list(range(4)))
+        self.assertTrue(all(len(items) <= 2 for items in self.bulk_calls))
+
+    def test_falls_back_to_single_calls(self):
+        def unsupported(items):
+            raise BulkUnsupported()
+
+        batcher = MicroBatcher('test', unsupported, self.send_one, max_wait=0.1)
+        results = self.submit_all(batcher, ['a', 'b', 'c'])
+        self.assertEqual(results, [({'item': item}, 200) for item in 'abc'])
+        self.assertFalse(batcher.bulk_supported)
+        self.assertEqual(sorted(self.single_calls), ['a', 'b', 'c'])
+
+    def test_rejected_batch_is_resent_singly(self):
+        def rejecting(items):
+            raise BulkRejected('HTTP 400')
+
+        def send_one(item):
+            return ({'error': 'invalid'}, 400) if item == 'bad' else ({'item': item}, 201)
+
+        batcher = MicroBatcher('test', rejecting, send_one, max_wait=0.1)
+        results = self.submit_all(batcher, ['a', 'bad', 'c'])
+        self.assertEqual(results, [({'item': 'a'}, 201), ({'error': 'invalid'}, 400), ({'item': 'c'}, 201)])
+        self.assertTrue(batcher.bulk_supported)
+
+    def test_bulk_errors_reach_every_caller(self):
+        def failing(items):
+            raise RuntimeError('upstream down')
+
+        batcher = MicroBatcher('test', failing, self.send_one, max_wait=0.1)
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
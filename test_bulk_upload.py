@@ -0,0 +1,107 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from test_app import app
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.content = json.dumps(body).encode()
+
+    def json(self):
+        return self.body
+
+
+class FakeUploadService:
+    """Accepts every file except bad.txt (400); down.txt cannot be reached"""
+
+    def __init__(self):
+        self.posts = []
+        self.gets = []
+
+    def post(self, url, files=None, headers=None, **kwargs):
+        file_name = files['file'][0]
+        self.posts.append((file_name, headers['X-Correlation-ID']))
+        if file_name == 'down.txt':
+            raise requests.exceptions.ConnectionError('refused')
+        if file_name == 'bad.txt':
+            return FakeResponse(400, {'error': 'unsupported type'})
+        return FakeResponse(202, {'upload_id': f'id-{file_name}'})
+
+    def get(self, url, headers=None, **kwargs):
+        upload_id = url.rsplit('/', 1)[1]
+        self.gets.append((upload_id, headers['X-Correlation-ID']))
+        return FakeResponse(200, {'upload_id': upload_id, 'status': 'COMPLETED'})
+
+
+class TestBulkUpload(unittest.TestCase):
+    def setUp(self):
+        self.upstream = FakeUploadService()
+        for method in ('post', 'get'):
+            patcher = mock.patch.object(app.http, method, getattr(self.upstream, method))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app.auth_cache.remember('tok', {'id': 7, 'username': 'u'})
+        app.auth_cache.remember('other', {'id': 8, 'username': 'o'})
+        self.client = app.app.test_client()
+
+    def upload(self, *names):
+        data = {'user_id': '7', 'files': [(io.BytesIO(b'data'), name) for name in names]}
+        return self.client.post('/api/upload/bulk', data=data, content_type='multipart/form-data',
+                                headers={'Authorization': 'Bearer tok'})
+
+    def test_files_are_forwarded_with_their_own_correlation_ids(self):
+        response = self.upload('a.txt', 'b.txt', 'c.txt')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([upload['upload_id'] for upload in response.json['uploads']],
+                         ['id-a.txt', 'id-b.txt', 'id-c.txt'])
+        self.assertEqual(sorted(name for name, _ in self.upstream.posts), ['a.txt', 'b.txt', 'c.txt'])
+        self.assertEqual(len({correlation_id for _, correlation_id in self.upstream.posts}), 3)
+
+    def test_partial_failure_is_accepted_and_reported_per_file(self):
+        response = self.upload('a.txt', 'bad.txt', 'down.txt')
+        self.assertEqual(response.status_code, 202)
+        uploads = {upload['file_name']: upload for upload in response.json['uploads']}
+        self.assertEqual(uploads['a.txt']['upload_id'], 'id-a.txt')
+        self.assertEqual(uploads['bad.txt']['error'], 'unsupported type')
+        self.assertEqual(uploads['down.txt']['error'], 'Upload service unavailable')
+
+    def test_every_file_rejected_is_a_client_error(self):
+        response = self.upload('bad.txt', 'down.txt')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([upload['file_name'] for upload in response.json['uploads']], ['bad.txt', 'down.txt'])
+
+    def test_every_file_unreachable_is_unavailable(self):
+        response = self.upload('down.txt')
+        self.assertEqual(response.status_code, 503)
+
+    def test_progress(self):
+        bulk = self.upload('a.txt', 'bad.txt').json
+        self.assertEqual(bulk['progress_url'], f"/api/upload/bulk/{bulk['bulk_id']}")
+
+        response = self.client.get(bulk['progress_url'], headers={'Authorization': 'Bearer tok'})
+        self.assertEqual(response.status_code, 200)
+        progress = json.loads(response.data)
+        self.assertEqual(progress['counts'], {'completed': 1, 'rejected': 1})
+        self.assertTrue(progress['done'])
+        self.assertEqual([upload_id for upload_id, _ in self.upstream.gets], ['id-a.txt'])
+
+    def test_progress_is_private_to_the_uploader(self):
+        bulk = self.upload('a.txt').json
+        response = self.client.get(bulk['progress_url'], headers={'Authorization': 'Bearer other'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.upstream.gets, [])
+
+    def test_unknown_bulk_upload(self):
+        response = self.client.get('/api/upload/bulk/missing', headers={'Authorization': 'Bearer tok'})
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
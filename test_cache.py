@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from cache import LRUCache, SharedMemoryCache, KeyValueCache, create_cache
+
+
+class FakeKeyValueClient:
+    """Local stand-in for a Redis client"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at and expires_at < time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        if ex is not None and not isinstance(ex, int):
+            raise TypeError('ex must be an integer, like redis-py')
+        self.data[key] = (value.encode(), time.time() + ex if ex else None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip('*')
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+
+class UnreachableClient:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('redis is down')
+        return fail
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_expires_entries(self):
+        cache = LRUCache(ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertNotIn('a', cache)
+
+
+class TestSharedMemoryCache(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'test.cache')
+
+    def test_visible_across_instances(self):
+        writer = SharedMemoryCache(path=self.path)
+        reader = SharedMemoryCache(path=self.path)
+        writer.set('user', {'id': 1})
+        self.assertEqual(reader.get('user'), {'id': 1})
+        reader.delete('user')
+        self.assertIsNone(writer.get('user'))
+
+    def test_bounded_size(self):
+        cache = SharedMemoryCache(path=self.path, maxsize=3)
+        for i in range(5):
+            cache.set(str(i), i)
+            time.sleep(0.001)
+        self.assertIsNone(cache.get('0'))
+        self.assertEqual(cache.get('4'), 4)
+
+    def test_locked_database_is_a_miss(self):
+        cache = SharedMemoryCache(path=self.path)
+        cache.set('a', 1)
+
+        def locked():
+            raise sqlite3.OperationalError('database is locked')
+
+        cache._conn = locked
+        self.assertIsNone(cache.get('a'))
+        cache.set('b', 2)
+        cache.delete('a')
+
+
+class TestKeyValueCache(unittest.TestCase):
+    def test_round_trip_with_stand_in(self):
+        cache = create_cache('redis', 'tokens', client=FakeKeyValueClient())
+        self.assertIsInstance(cache, KeyValueCache)
+        cache.set('t', {'id': 7})
+        self.assertEqual(cache.get('t'), {'id': 7})
+        cache.clear()
+        self.assertIsNone(cache.get('t'))
+
+    def test_fractional_ttl_is_rounded_up(self):
+        client = FakeKeyValueClient()
+        cache = KeyValueCache(client=client, prefix='p')
+        cache.set('t', 1, ttl=0.01)
+        self.assertEqual(cache.get('t'), 1)
+
+    def test_outage_is_a_miss(self):
+        cache = KeyValueCache(client=UnreachableClient(), prefix='p')
+        cache.set('t', 1)
+        cache.delete('t')
+        self.assertEqual(cache.get('t', 'miss'), 'miss')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_cache('memcached', 'tokens')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import gzip
+import unittest
+
+from flask import Flask, Response
+
+from compression import choose_encoding, init_compression, settings
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_compression(self.app, min_size=100)
+
+        @self.app.route('/small')
+        def small():
+            return {'ok': True}
+
+        @self.app.route('/large')
+        def large():
+            return {'messages': ['hello'] * 100}
+
+        @self.app.route('/stream')
+        def stream():
+            chunks = (b'{"messages": [' + b'"hello",' * 50 + b'"end"]}' for _ in range(1))
+            return Response(chunks, mimetype='application/json', direct_passthrough=True)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        settings['min_size'] = 1024
+
+    def test_choose_encoding_respects_quality(self):
+        self.assertEqual(choose_encoding('gzip;q=0.5, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(choose_encoding(None))
+
+    def test_small_bodies_are_not_compressed(self):
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_large_bodies_are_compressed(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertIn(b'hello', gzip.decompress(response.data))
+
+    def test_streamed_bodies_are_compressed_on_the_fly(self):
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertTrue(gzip.decompress(response.data).endswith(b'"end"]}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from concurrency import AdaptiveLimit, ConcurrencyLimits, Overloaded
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    def run_calls(self, limit, count, latency):
+        for _ in range(count):
+            limit.release(limit.acquire() - latency)
+
+    def test_grows_while_latency_holds(self):
+        limit = AdaptiveLimit('test', initial=4, max_limit=8)
+        for _ in range(200):
+            slots = [limit.acquire() for _ in range(int(limit.limit))]
+            for started in slots:
+                limit.release(started - 0.01)
+        self.assertEqual(int(limit.limit), 8)
+
+    def test_backs_off_when_latency_rises(self):
+        limit = AdaptiveLimit('test', initial=20)
+        self.run_calls(limit, 50, 0.01)
+        before = limit.limit
+        for _ in range(20):
+            started = limit.acquire()
+            time.sleep(0.001)
+            limit.release(started - 0.2)
+        self.assertLess(limit.limit, before)
+        self.assertTrue(limit.snapshot()['history'])
+
+    def test_failures_cut_the_limit(self):
+        limit = AdaptiveLimit('test', initial=10)
+        limit.release(limit.acquire(), failed=True)
+        self.assertEqual(int(limit.limit), 9)
+
+    def test_excess_calls_queue_then_shed(self):
+        limit = AdaptiveLimit('test', initial=1, min_limit=1, queue_timeout=0.05, max_queue=1)
+        held = limit.acquire()
+        with self.assertRaises(Overloaded):
+            limit.acquire()
+        self.assertEqual(limit.shed, 1)
+
+        threading.Timer(0.01, limit.release, (held,)).start()
+        limit.release(limit.acquire())
+        self.assertEqual(limit.in_flight, 0)
+
+
+class TestConcurrencyLimits(unittest.TestCase):
+    def test_calls_are_routed_by_backend_url(self):
+        limits = ConcurrencyLimits(lambda: {'auth': 'http://auth', 'upload': 'http://upload'}, initial=10)
+        limits.call('http://upload/api/upload', lambda: FakeResponse(503))
+        self.assertEqual(limits.snapshot()['upload']['limit'], 9)
+        self.assertEqual(limits.snapshot()['auth']['limit'], 10)
+        self.assertEqual(limits.call('http://other/x', lambda: 'sent'), 'sent')
+
+    def test_streamed_calls_hold_the_slot_until_closed(self):
+        limits = ConcurrencyLimits(lambda: {'content': 'http://content'})
+        limit = limits.limits['content']
+        response = limits.call('http://content/api/content', FakeResponse, stream=True)
+        self.assertEqual(limit.in_flight, 1)
+        time.sleep(0.05)
+        response.close()
+        response.close()
+        self.assertTrue(response.closed)
+        self.assertEqual(limit.in_flight, 0)
+        # Judged by time to headers, not by how long the body took to relay
+        self.assertLess(limit.smoothed, 0.04)
+
+    def test_streamed_slot_is_freed_when_the_response_is_dropped(self):
+        limits = ConcurrencyLimits(lambda: {'content': 'http://content'})
+        limits.call('http://content/api/content', FakeResponse, stream=True)
+        self.assertEqual(limits.limits['content'].in_flight, 0)
+
+    def test_failed_sends_release_the_slot(self):
+        limits = ConcurrencyLimits(lambda: {'content': 'http://content'}, initial=10)
+
+        def send():
+            raise ConnectionError('refused')
+
+        with self.assertRaises(ConnectionError):
+            limits.call('http://content/api/content', send, stream=True)
+        self.assertEqual(limits.limits['content'].in_flight, 0)
+        self.assertEqual(limits.snapshot()['content']['limit'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import unittest
+from unittest import mock
+
+import requests
+from flask import Flask
+from urllib3 import HTTPResponse
+
+import conditional
+from cache import LRUCache
+from conditional import conditional_get, etag_matches, invalidate, invalidate_scope, scoped_key
+
+
+def upstream(body=b'{"id": 1}', status=200, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = HTTPResponse(body=io.BytesIO(body), headers=headers or {}, status=status, preload_content=False)
+    return response
+
+
+class TestEtagMatching(unittest.TestCase):
+    def test_matches_ignore_weakness_and_encoding_suffix(self):
+        self.assertTrue(etag_matches('W/"abc"', '"abc"'))
+        self.assertTrue(etag_matches('"abc-gzip"', '"abc"'))
+        self.assertTrue(etag_matches('"x", "abc-br"', '"abc"'))
+        self.assertTrue(etag_matches('*', '"abc"'))
+        self.assertFalse(etag_matches('"abd"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+
+
+class TestConditionalGet(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.cache = LRUCache()
+        self.sent = []
+
+    def get(self, key='/api/convos/1', headers=None, response=None):
+        def send(validators):
+            self.sent.append(validators)
+            return response or upstream()
+
+        with self.app.test_request_context(key, headers=headers or {}):
+            return conditional_get(self.cache, key, send, ttl=60)
+
+    def test_answers_304_from_cached_validator(self):
+        etag = self.get().headers['ETag']
+        response = self.get(headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(self.sent), 1)
+
+    def test_relays_upstream_304(self):
+        response = self.get(headers={'If-None-Match': '"old"'}, response=upstream(b'', 304, {'ETag': '"old"'}))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], '"old"')
+        self.assertEqual(self.sent, [{'If-None-Match': '"old"'}])
+
+    def test_invalidate_forces_upstream_call(self):
+        etag = self.get().headers['ETag']
+        invalidate(self.cache, '/api/convos/1')
+        self.assertEqual(self.get(headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_scope_invalidation_changes_keys(self):
+        key = scoped_key(self.cache, 'lists', '/api/convos?user_id=1')
+        self.assertEqual(scoped_key(self.cache, 'lists', '/api/convos?user_id=1'), key)
+        invalidate_scope(self.cache, 'lists')
+        self.assertNotEqual(scoped_key(self.cache, 'lists', '/api/convos?user_id=1'), key)
+
+    def test_large_chunked_body_streams_without_etag(self):
+        with mock.patch.object(conditional, 'MAX_ETAG_BODY', 8):
+            response = self.get(response=upstream(b'x' * 20))
+            self.assertNotIn('ETag', response.headers)
+            self.assertEqual(b''.join(response.response), b'x' * 20)
+        self.assertIsNone(self.cache.get('/api/convos/1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
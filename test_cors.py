@@ -0,0 +1,66 @@
+import unittest
+
+from flask import Flask
+from flask_cors import CORS
+
+from cors import init_preflight, parse_origins
+
+
+class TestPreflight(unittest.TestCase):
+    def client(self, origins):
+        # Configured as app.py does: one parsed list for flask-cors and the preflight handler
+        origins = parse_origins(origins)
+        app = Flask(__name__)
+        app.add_url_rule('/api/convos', 'convos', lambda: 'listed', methods=['GET', 'OPTIONS'])
+        CORS(app, resources={r"/*": {"origins": origins}}, supports_credentials=True)
+        init_preflight(app, origins=origins, max_age=600)
+        return app.test_client()
+
+    def preflight(self, client, origin):
+        return client.options('/api/convos', headers={
+            'Origin': origin,
+            'Access-Control-Request-Method': 'GET',
+            'Access-Control-Request-Headers': 'Authorization',
+        })
+
+    def test_single_origin_string(self):
+        client = self.client('https://app.gnosis.com')
+        response = self.preflight(client, 'https://app.gnosis.com')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], 'https://app.gnosis.com')
+        self.assertEqual(response.headers['Access-Control-Allow-Headers'], 'Authorization')
+        self.assertEqual(response.headers['Access-Control-Max-Age'], '600')
+        self.assertEqual(self.preflight(client, 'h').status_code, 403)
+
+    def test_origin_list_and_wildcard(self):
+        client = self.client('https://a.example, https://b.example')
+        self.assertEqual(self.preflight(client, 'https://b.example').status_code, 204)
+        self.assertEqual(self.preflight(client, 'https://c.example').status_code, 403)
+        response = self.preflight(self.client('*'), 'https://c.example')
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], 'https://c.example')
+
+    def test_other_requests_pass_through(self):
+        client = self.client(['https://a.example'])
+        self.assertEqual(client.get('/api/convos').data, b'listed')
+
+    def test_actual_requests_allow_each_listed_origin(self):
+        client = self.client('https://a.example, https://b.example')
+        for origin in ('https://a.example', 'https://b.example'):
+            response = client.get('/api/convos', headers={'Origin': origin})
+            self.assertEqual(response.data, b'listed')
+            self.assertEqual(response.headers.get('Access-Control-Allow-Origin'), origin)
+        response = client.get('/api/convos', headers={'Origin': 'https://c.example'})
+        self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+
+    def test_actual_requests_with_wildcard(self):
+        response = self.client('*').get('/api/convos', headers={'Origin': 'https://c.example'})
+        self.assertEqual(response.headers.get('Access-Control-Allow-Origin'), 'https://c.example')
+
+    def test_parse_origins(self):
+        self.assertEqual(parse_origins(' https://a.example,https://b.example ,'), ['https://a.example', 'https://b.example'])
+        self.assertEqual(parse_origins(['https://a.example']), ['https://a.example'])
+        self.assertEqual(parse_origins('*'), ['*'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import time
+import unittest
+
+from flask import Flask, g
+
+from profiling import RouteTimings, SamplingProfiler, timed
+
+
+class TestTimed(unittest.TestCase):
+    def test_nested_phase_booked_to_outer(self):
+        app = Flask(__name__)
+        with app.test_request_context('/'):
+            g.timings = {}
+            with timed('auth'):
+                with timed('upstream'):
+                    time.sleep(0.01)
+            self.assertEqual(list(g.timings), ['auth'])
+            self.assertGreaterEqual(g.timings['auth'], 0.01)
+
+            with timed('upstream'):
+                pass
+            self.assertIn('upstream', g.timings)
+
+    def test_no_op_outside_requests(self):
+        with timed('upstream'):
+            pass
+
+
+class TestRouteTimings(unittest.TestCase):
+    def test_report_averages_per_route(self):
+        timings = RouteTimings()
+        timings.record('/api/convos', 0.2, {'upstream': 0.1})
+        timings.record('/api/convos', 0.4, {'upstream': 0.3, 'auth': 0.02})
+        report = timings.report()['/api/convos']
+        self.assertEqual(report['count'], 2)
+        self.assertEqual(report['avg_ms'], 300.0)
+        self.assertEqual(report['max_ms'], 400.0)
+        self.assertEqual(report['avg_phase_ms']['upstream'], 200.0)
+        self.assertEqual(report['avg_phase_ms']['auth'], 10.0)
+        timings.reset()
+        self.assertEqual(timings.report(), {})
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_keeps_samples_only_for_slow_requests(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.set_threshold(0.05)
+        self.addCleanup(profiler.set_threshold, None)
+
+        profiler.begin_request('/fast')
+        time.sleep(0.02)
+        profiler.end_request(0.02)
+
+        profiler.begin_request('/slow')
+        time.sleep(0.02)
+        profiler.end_request(0.08)
+
+        stacks = profiler.collapsed()
+        self.assertIn('/slow;', stacks)
+        self.assertNotIn('/fast;', stacks)
+        self.assertEqual(profiler.collapsed('/fast'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
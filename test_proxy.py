@@ -0,0 +1,72 @@
+import gzip
+import io
+import json
+import unittest
+
+import requests
+from flask import Flask
+from requests.structures import CaseInsensitiveDict
+from urllib3.response import HTTPResponse
+
+from proxy import passthrough, relay_request_headers
+
+
+class UpstreamResponse(requests.Response):
+    def __init__(self, status_code, body, headers):
+        super().__init__()
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status_code, preload_content=False)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+class TestPassthrough(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.body = gzip.compress(json.dumps({'conversations': ['hello'] * 100}).encode())
+        self.upstream = UpstreamResponse(203, self.body, {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Content-Length': str(len(self.body)),
+            'ETag': '"abc"',
+            'Set-Cookie': 'session=upstream',
+        })
+        self.app.add_url_rule('/api/convos', 'convos', lambda: passthrough(self.upstream))
+
+    def test_relays_raw_bytes_status_and_headers(self):
+        response = self.app.test_client().get('/api/convos', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 203)
+        self.assertEqual(response.get_data(), self.body)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Content-Length'], str(len(self.body)))
+        self.assertEqual(response.headers['ETag'], '"abc"')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Set-Cookie', response.headers)
+
+    def test_head_bytes_are_sent_first(self):
+        upstream = UpstreamResponse(200, self.body[10:], {'Content-Type': 'application/json'})
+        with self.app.test_request_context('/api/convos'):
+            response = passthrough(upstream, head=self.body[:10])
+            self.assertEqual(b''.join(response.response), self.body)
+        self.assertNotIn('Vary', response.headers)
+
+    def test_upstream_is_closed_after_iteration(self):
+        response = self.app.test_client().get('/api/convos')
+        self.assertFalse(self.upstream.closed)
+        response.get_data()
+        response.close()
+        self.assertTrue(self.upstream.closed)
+
+    def test_relay_request_headers(self):
+        with self.app.test_request_context('/api/convos', headers={'Accept-Encoding': 'br, gzip'}):
+            self.assertEqual(relay_request_headers({'X-API-KEY': 'k'}), {'X-API-KEY': 'k', 'Accept-Encoding': 'br, gzip'})
+        with self.app.test_request_context('/api/convos'):
+            self.assertEqual(relay_request_headers({})['Accept-Encoding'], 'identity')
+
+
+if __name__ == '__main__':
+    unittest.main()
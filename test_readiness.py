@@ -0,0 +1,74 @@
+import unittest
+
+from readiness import Readiness
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.status = {}
+        self.calls = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.calls.append(url)
+        self.options = kwargs
+        status = self.status.get(url.split('/')[2], 200)
+        if isinstance(status, Exception):
+            raise status
+        return FakeResponse(status)
+
+
+class TestReadiness(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.readiness = Readiness(
+            self.session,
+            lambda: {'auth': 'http://auth', 'upload': 'http://upload'},
+            failure_threshold=2,
+            connections=3
+        )
+
+    def test_not_ready_until_warmed(self):
+        self.readiness.probe()
+        self.assertFalse(self.readiness.ready)
+        self.readiness.warm_up([('connections', self.readiness.open_connections)])
+        self.assertTrue(self.readiness.ready)
+        self.assertEqual(len(self.session.calls), 2 + 2 * 3)
+
+    def test_failed_warmup_task_does_not_block(self):
+        def broken():
+            raise RuntimeError('boom')
+
+        self.readiness.warm_up([('broken', broken), ('probe', self.readiness.probe)])
+        self.assertTrue(self.readiness.ready)
+        self.assertIn('broken', self.readiness.report()['warmup_errors'])
+
+    def test_backend_down_after_consecutive_failures(self):
+        self.readiness.warm_up([('probe', self.readiness.probe)])
+        self.session.status['upload'] = ConnectionError('refused')
+        self.readiness.probe()
+        self.assertTrue(self.readiness.ready)
+        self.readiness.probe()
+        self.assertFalse(self.readiness.ready)
+        self.assertEqual(self.readiness.report()['backends']['upload']['error'], 'refused')
+
+    def test_unanswered_backend_is_not_ready(self):
+        self.session.status['auth'] = 503
+        self.readiness.warm_up([('probe', self.readiness.probe)])
+        self.assertFalse(self.readiness.ready)
+
+    def test_probes_pass_request_options(self):
+        readiness = Readiness(self.session, lambda: {'auth': 'http://auth'}, request_options={'limited': False})
+        readiness.probe()
+        self.assertEqual(self.session.options, {'limited': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import unittest
+
+import requests
+from flask import Flask
+from flask_restx import Api
+
+from cache import LRUCache
+from routes import Route, RouteTable, upstream_path
+
+
+class FakeResponse:
+    status_code = 200
+    content = b'{"ok": true}'
+
+    def json(self):
+        return {'ok': True}
+
+
+class RawResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FixedSession:
+    def __init__(self, response):
+        self.response = response
+
+    def request(self, method, url, **kwargs):
+        return self.response
+
+
+class FlakySession:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        if len(self.calls) <= self.failures:
+            raise requests.exceptions.ConnectionError('refused')
+        return FakeResponse()
+
+
+class TestRouteTable(unittest.TestCase):
+    def build(self, session, routes):
+        app = Flask(__name__)
+        api = Api(app)
+        ns = api.namespace('api')
+        table = RouteTable(api, ns, session, lambda: {'svc': 'http://svc'}, lambda: {'X-API-KEY': 'k'},
+                           LRUCache(), retries=2, retry_backoff=0)
+        table.compile(routes)
+        return app.test_client(), table
+
+    def test_upstream_path(self):
+        self.assertEqual(upstream_path('/convos/<int:conversation_id>/reply'), '/api/convos/{conversation_id}/reply')
+
+    def test_idempotent_routes_retry(self):
+        session = FlakySession(failures=2)
+        client, table = self.build(session, [Route('/items/<int:item_id>', 'DELETE', 'svc')])
+        response = client.delete('/api/items/3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.calls[-1], ('DELETE', 'http://svc/api/items/3'))
+        self.assertEqual(table.report()[0]['retries'], 2)
+
+    def test_non_idempotent_routes_fail_fast(self):
+        session = FlakySession(failures=1)
+        client, table = self.build(session, [Route('/items', 'POST', 'svc', unavailable='Items unavailable')])
+        response = client.post('/api/items', json={'a': 1})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json['message'], 'Items unavailable')
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(table.report()[0]['failures'], 1)
+
+    def test_methods_share_a_resource(self):
+        session = FlakySession(failures=0)
+        client, _ = self.build(session, [
+            Route('/items', 'GET', 'svc'),
+            Route('/items', 'POST', 'svc', respond=lambda body, status, kwargs: ({'created': kwargs['json']}, 201)),
+        ])
+        self.assertEqual(client.get('/api/items').status_code, 200)
+        response = client.post('/api/items', json={'a': 1})
+        self.assertEqual((response.status_code, response.json), (201, {'created': {'a': 1}}))
+
+    def test_send_hooks_get_the_route_timeout(self):
+        seen = []
+
+        def send(kwargs, headers, timeout):
+            seen.append(timeout)
+            return {'sent': True}, 201
+
+        client, _ = self.build(FlakySession(failures=0), [Route('/items', 'POST', 'svc', timeout=7, send=send)])
+        self.assertEqual(client.post('/api/items', json={}).status_code, 201)
+        self.assertEqual(seen, [7])
+
+    def test_empty_and_non_json_bodies_are_relayed(self):
+        client, table = self.build(FixedSession(RawResponse(204, b'')), [Route('/items/<int:item_id>', 'DELETE', 'svc')])
+        self.assertEqual(client.delete('/api/items/3').status_code, 204)
+        self.assertEqual(table.report()[0]['failures'], 0)
+
+        client, _ = self.build(FixedSession(RawResponse(200, b'deleted')), [Route('/items/<int:item_id>', 'DELETE', 'svc')])
+        response = client.delete('/api/items/3')
+        self.assertEqual((response.status_code, response.json), (200, 'deleted'))
+
+
+if __name__ == '__main__':
+    unittest.main()
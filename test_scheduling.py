@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+
+from scheduling import PriorityScheduler, QueueTimeout, pool_for
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = PriorityScheduler(
+            slots=4,
+            shares={'interactive': 0.5, 'write': 0.25, 'bulk': 0.25},
+            timeout=0.2
+        )
+
+    def test_pool_for(self):
+        self.assertEqual(pool_for('GET', '/api/convos'), 'interactive')
+        self.assertEqual(pool_for('POST', '/api/login'), 'interactive')
+        self.assertEqual(pool_for('POST', '/api/upload'), 'bulk')
+        self.assertEqual(pool_for('DELETE', '/api/convos/1'), 'write')
+
+    def test_bulk_cannot_take_interactive_reservation(self):
+        self.scheduler.acquire('bulk')
+        with self.assertRaises(QueueTimeout):
+            self.scheduler.acquire('bulk')
+        self.scheduler.acquire('interactive')
+        self.scheduler.acquire('interactive')
+
+    def test_interactive_borrows_idle_slots(self):
+        for _ in range(4):
+            self.scheduler.acquire('interactive')
+        self.assertEqual(self.scheduler.snapshot()['interactive']['in_use'], 4)
+
+    def test_waiting_interactive_runs_before_waiting_bulk(self):
+        scheduler = PriorityScheduler(slots=3, shares={'interactive': 0.67, 'bulk': 0.33}, timeout=2)
+        scheduler.acquire('bulk')
+        scheduler.acquire('interactive')
+        scheduler.acquire('interactive')
+        order = []
+
+        def run(pool):
+            scheduler.acquire(pool)
+            order.append(pool)
+
+        bulk = threading.Thread(target=run, args=('bulk',))
+        bulk.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=run, args=('interactive',))
+        interactive.start()
+        time.sleep(0.05)
+
+        scheduler.release('interactive')
+        interactive.join(1)
+        self.assertEqual(order, ['interactive'])
+        scheduler.release('bulk')
+        bulk.join(1)
+        self.assertEqual(order, ['interactive', 'bulk'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import boto3
 import json
+import os
+import time
+import unittest
+from unittest import mock
 from botocore.exceptions import ClientError
 
 def get_secrets(secret_name, region_name="us-east-1"):
@@ -45,6 +49,43 @@ def get_service_secrets(service_name):
     # print(secrets)
     return secrets.get(service_name, {})
 
+class TestSecretsSnapshot(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        import secrets_manager
+        self.sm = secrets_manager
+        self.sm.SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(), 'snapshot.json')
+        self.sm._cache.update({'secrets': None, 'fetched_at': 0})
+
+    def test_starts_from_snapshot_without_aws(self):
+        self.sm.save_snapshot({'gnosis-composer': {'PORT': '5001'}})
+        with mock.patch.object(self.sm, 'get_secrets') as fetch:
+            self.assertEqual(self.sm.get_service_secrets('gnosis-composer'), {'PORT': '5001'})
+            fetch.assert_not_called()
+
+    def test_fetches_and_writes_snapshot(self):
+        with mock.patch.object(self.sm, 'get_secrets', return_value={'gnosis-composer': {'PORT': '1'}}):
+            self.assertEqual(self.sm.get_service_secrets('gnosis-composer'), {'PORT': '1'})
+        self.assertEqual(self.sm.load_snapshot()[0], {'gnosis-composer': {'PORT': '1'}})
+
+    def test_snapshot_keeps_only_composer_secrets(self):
+        self.sm.save_snapshot({'gnosis-composer': {'PORT': '1'}, 'gnosis-auth': {'JWT_SECRET': 'x'}})
+        self.assertEqual(self.sm.load_snapshot()[0], {'gnosis-composer': {'PORT': '1'}})
+
+    def test_refresh_failure_keeps_cached_values(self):
+        self.sm._cache.update({'secrets': {'gnosis-composer': {'PORT': '2'}}, 'fetched_at': time.time()})
+        with mock.patch.object(self.sm, 'get_secrets', side_effect=RuntimeError('offline')):
+            self.assertFalse(self.sm.refresh_secrets())
+        self.assertEqual(self.sm.get_service_secrets('gnosis-composer'), {'PORT': '2'})
+
+    def test_refresh_notifies_listeners(self):
+        seen = []
+        self.sm.add_refresh_listener(seen.append)
+        self.addCleanup(self.sm._listeners.remove, seen.append)
+        with mock.patch.object(self.sm, 'get_secrets', return_value={'a': {}}):
+            self.sm.refresh_secrets()
+        self.assertEqual(seen, [{'a': {}}])
+
 def main():
     secrets = get_service_secrets('gnosis-composer')
     print(secrets)
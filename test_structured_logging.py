@@ -0,0 +1,69 @@
+import logging
+import queue
+import unittest
+
+from flask import Flask
+from flask.logging import default_handler
+
+import structured_logging
+from structured_logging import NonBlockingQueueHandler, RequestContextFilter, configure_logging, log_body, update_logging
+
+
+class TestStructuredLogging(unittest.TestCase):
+    def setUp(self):
+        saved = dict(structured_logging.settings, sample_rates=dict(structured_logging.settings['sample_rates']))
+        self.addCleanup(structured_logging.settings.update, saved)
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/api/convos', 'convos', lambda: '')
+
+    def record(self, level):
+        return logging.LogRecord('test', level, __file__, 1, 'message', None, None)
+
+    def test_full_queue_drops_records(self):
+        dropped = structured_logging.stats['dropped']
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        handler.emit(self.record(logging.INFO))
+        handler.emit(self.record(logging.INFO))
+        self.assertEqual(structured_logging.stats['dropped'], dropped + 1)
+
+    def test_routes_are_sampled_but_warnings_kept(self):
+        update_logging(sample_rates={'/api/convos': 0})
+        log_filter = RequestContextFilter()
+        with self.app.test_request_context('/api/convos'):
+            self.assertFalse(log_filter.filter(self.record(logging.INFO)))
+            self.assertTrue(log_filter.filter(self.record(logging.WARNING)))
+            self.assertTrue(log_filter.filter(self.record(logging.ERROR)))
+        with self.app.test_request_context('/other'):
+            self.assertTrue(log_filter.filter(self.record(logging.INFO)))
+
+    def test_body_preview_truncates(self):
+        update_logging(body_limit=4)
+        self.assertEqual(str(log_body(b'abcdefgh')), 'abcd... [truncated]')
+        self.assertEqual(str(log_body({'a': 1})), '{"a"... [truncated]')
+        self.assertEqual(str(log_body('abcd')), 'abcd')
+
+    def test_unknown_settings_rejected(self):
+        with self.assertRaises(ValueError):
+            update_logging(verbosity='high')
+
+    def test_app_logger_logs_only_through_the_queue(self):
+        root = logging.getLogger()
+        saved = list(root.handlers), root.level, structured_logging._listener
+
+        def restore():
+            structured_logging._listener.stop()
+            root.handlers[:], level, structured_logging._listener = saved
+            root.setLevel(level)
+            if structured_logging._listener is not None:
+                structured_logging._listener.start()
+
+        self.addCleanup(restore)
+        # Flask only adds its stderr handler when nothing else handles the level yet
+        self.app.logger.addHandler(default_handler)
+        configure_logging(app=self.app)
+        self.assertNotIn(default_handler, self.app.logger.handlers)
+        self.assertIsInstance(root.handlers[0], NonBlockingQueueHandler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import time
+import unittest
+
+from upload_status import UploadStatusStore, summarize
+
+
+class TestUploadStatusStore(unittest.TestCase):
+    def test_in_flight_states_expire_quickly(self):
+        store = UploadStatusStore(ttl=0.01, terminal_ttl=60)
+        store.put('a', {'status': 'processing'})
+        store.put('b', {'status': 'COMPLETED'})
+        time.sleep(0.02)
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(store.get('b'), {'status': 'COMPLETED', 'upload_id': 'b'})
+
+    def test_bounded_memory(self):
+        store = UploadStatusStore(maxsize=2)
+        for upload_id in ('a', 'b', 'c'):
+            store.put(upload_id, {'status': 'completed'})
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get('a'))
+
+    def test_persisted_statuses_are_shared(self):
+        db_path = os.path.join(tempfile.mkdtemp(), 'status.db')
+        UploadStatusStore(db_path=db_path).put('a', {'status': 'failed'})
+        self.assertEqual(UploadStatusStore(db_path=db_path).get('a')['status'], 'failed')
+
+
+class TestSummarize(unittest.TestCase):
+    def test_combined_progress(self):
+        report = summarize([
+            {'file_name': 'a', 'upload_id': '1', 'status': {'status': 'COMPLETED'}},
+            {'file_name': 'b', 'upload_id': '2', 'status': {'status': 'processing', 'progress': 50}},
+            {'file_name': 'c', 'error': 'unsupported type'},
+            {'file_name': 'd', 'upload_id': '3', 'status': None},
+        ])
+        self.assertEqual(report['counts'], {'completed': 1, 'processing': 1, 'rejected': 1, 'unknown': 1})
+        self.assertEqual(report['progress'], 62)
+        self.assertFalse(report['done'])
+
+    def test_done_when_every_file_finished(self):
+        report = summarize([
+            {'file_name': 'a', 'upload_id': '1', 'status': {'status': 'failed'}},
+            {'file_name': 'b', 'error': 'Upload service unavailable'},
+        ])
+        self.assertTrue(report['done'])
+        self.assertEqual(report['progress'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Upload status store: bounded LRU with per-entry expiry, optionally persisted to a
+# local SQLite database so every worker on the host sees callback updates.
+# Terminal states are kept until they expire; in-flight states only briefly.
+
+TERMINAL_STATES = ('completed', 'failed')
+
+
+def is_terminal(status):
+    return str(status.get('status', '')).lower() in TERMINAL_STATES
+
+
+def summarize(uploads):
+    """
+    Combine the statuses of a bulk upload's files into one progress report
+
+    Args:
+        uploads (list): Per-file dicts with file_name, upload_id and the latest status dict
+            (None if unknown); files the upload service rejected carry 'error' instead
+
+    Returns:
+        dict: Counts by state, overall progress percentage and whether every file is finished
+    """
+    counts = {}
+    progress = 0
+    for upload in uploads:
+        status = upload.get('status') or {}
+        state = 'rejected' if upload.get('error') else str(status.get('status', 'unknown')).lower()
+        counts[state] = counts.get(state, 0) + 1
+        if upload.get('error') or is_terminal(status):
+            progress += 100
+        else:
+            progress += min(100, max(0, int(status.get('progress') or 0)))
+
+    finished = sum(counts.get(state, 0) for state in TERMINAL_STATES + ('rejected',))
+    return {
+        'total': len(uploads),
+        'counts': counts,
+        'progress': progress // len(uploads) if uploads else 100,
+        'done': finished == len(uploads),
+    }
+
+
+class UploadStatusStore:
+    """
+    Args:
+        maxsize (int): Entries kept in memory before the least recently used are evicted
+        ttl (float): Seconds an in-flight status is served without asking the upload service
+        terminal_ttl (float): Seconds a completed or failed status is kept
+        db_path (str): Optional SQLite database path for persistence and cross-worker sharing
+    """
+
+    def __init__(self, maxsize=10000, ttl=2, terminal_ttl=3600, db_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if db_path:
+            self._db().execute(
+                'CREATE TABLE IF NOT EXISTS upload_status ('
+                'upload_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db().execute('CREATE INDEX IF NOT EXISTS upload_status_expiry ON upload_status (expires_at)')
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, upload_id, status, expires_at):
+        with self._lock:
+            self._entries[upload_id] = (status, expires_at)
+            self._entries.move_to_end(upload_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, upload_id):
+        """
+        Return the known status of an upload, or None if unknown or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._entries.move_to_end(upload_id)
+                    return entry[0]
+                del self._entries[upload_id]
+
+        if not self.db_path:
+            return None
+        row = self._db().execute(
+            'SELECT data, expires_at FROM upload_status WHERE upload_id = ? AND expires_at >= ?',
+            (upload_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        status = json.loads(row[0])
+        self._remember(upload_id, status, row[1])
+        return status
+
+    def put(self, upload_id, status):
+        """
+        Record the latest status of an upload
+        """
+        status = dict(status, upload_id=upload_id)
+        expires_at = time.time() + (self.terminal_ttl if is_terminal(status) else self.ttl)
+        self._remember(upload_id, status, expires_at)
+        if self.db_path:
+            db = self._db()
+            db.execute(
+                'INSERT OR REPLACE INTO upload_status (upload_id, data, expires_at) VALUES (?, ?, ?)',
+                (upload_id, json.dumps(status), expires_at)
+            )
+            db.execute('DELETE FROM upload_status WHERE expires_at < ?', (time.time(),))
+        return status
+
+    def __len__(self):
+        return len(self._entries)